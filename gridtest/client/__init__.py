@@ -74,7 +74,7 @@ def get_parser():
     test.add_argument(
         "--save",
         dest="save",
-        help="save a json or pickle (pkl) export of test results, determined by extension.",
+        help="save a json, pickle (pkl), streaming ndjson/jsonl, or sqlite export of test results, determined by extension.",
         default=None,
     )
 
@@ -89,7 +89,7 @@ def get_parser():
     test.add_argument(
         "--save-metrics",
         dest="save_metrics",
-        help="save metrics from tests only",
+        help="save metrics from tests only, as json or columnar csv, parquet, or npz",
         default=None,
     )
 
@@ -133,10 +133,186 @@ def get_parser():
         default=None,
     )
 
+    test.add_argument(
+        "--incremental",
+        dest="incremental",
+        help="reuse cached results for tests with unchanged source, args and checks",
+        default=False,
+        action="store_true",
+    )
+
+    test.add_argument(
+        "--prune-cache",
+        dest="prune_cache",
+        help="with --incremental, remove cache entries not used in this many days (0 is this run)",
+        type=int,
+        default=None,
+    )
+
+    test.add_argument(
+        "--last-failed",
+        "--lf",
+        dest="last_failed",
+        help="only run the tests that failed in the last run",
+        default=False,
+        action="store_true",
+    )
+
+    test.add_argument(
+        "--failed-first",
+        "--ff",
+        dest="failed_first",
+        help="run the tests that failed in the last run first, then the rest",
+        default=False,
+        action="store_true",
+    )
+
+    test.add_argument(
+        "--watch",
+        dest="watch",
+        help="after running, watch the test file and sources and run affected tests again",
+        default=False,
+        action="store_true",
+    )
+
+    test.add_argument(
+        "--profile",
+        dest="profile",
+        help="run tests with cProfile, and save profiles and hotspots to this directory",
+        default=None,
+    )
+
+    test.add_argument(
+        "--scaling",
+        dest="scaling",
+        help="fit how a metric grows with this numeric grid argument (e.g., n)",
+        default=None,
+    )
+
+    test.add_argument(
+        "--scaling-metric",
+        dest="scaling_metric",
+        help="the metric to fit for --scaling (defaults to @benchmark.median or @timeit)",
+        default=None,
+    )
+
+    test.add_argument(
+        "--scaling-limit",
+        dest="scaling_limit",
+        help="fail if a best fit grows faster than this model with --scaling",
+        choices=["constant", "log n", "n", "n log n", "n^2"],
+        default=None,
+    )
+
+    test.add_argument(
+        "--group-by",
+        dest="group_by",
+        help="summarize metrics for each function and values of these arguments",
+        nargs="*",
+        default=None,
+    )
+
+    test.add_argument(
+        "--server",
+        dest="server",
+        help="submit the run to a server started with gridtest serve",
+        default=False,
+        action="store_true",
+    )
+
     test.add_argument(
         "--pattern", help="match a pattern to filter testing", type=str, default=None,
     )
 
+    # Keep a warm pool of workers to submit runs to
+    serve = subparsers.add_parser(
+        "serve", help="run a server with warm workers for gridtest test --server."
+    )
+
+    serve.add_argument(
+        "--nproc",
+        help="number of processes for running tests (defaults to 2*ncores + 1)",
+        type=int,
+    )
+
+    serve.add_argument(
+        "--preload",
+        dest="preload",
+        help="modules to import before starting workers (e.g., numpy sklearn)",
+        nargs="*",
+        default=[],
+    )
+
+    # Both test and serve can choose the socket
+    for group in [test, serve]:
+        group.add_argument(
+            "--socket",
+            dest="socket",
+            help="the unix socket for gridtest serve (defaults to GRIDTEST_SOCKET)",
+            default=None,
+        )
+
+    # Run tests as benchmarks, and compare to a baseline
+    bench = subparsers.add_parser(
+        "bench", help="run grid tests as benchmarks, and compare to a baseline."
+    )
+
+    bench.add_argument(
+        "filename",
+        help="gridtest file to run benchmarks for",
+        type=str,
+        default="gridtest.yml",
+        nargs="?",
+    )
+
+    bench.add_argument(
+        "--baseline",
+        dest="baseline",
+        help="a baseline json file to compare to, exit with 1 if a test is slower",
+        default=None,
+    )
+
+    bench.add_argument(
+        "--save-baseline",
+        dest="save_baseline",
+        help="save the timings as a baseline json file",
+        default=None,
+    )
+
+    bench.add_argument(
+        "--tolerance",
+        dest="tolerance",
+        help="allowed slowdown before a test is slower (defaults to 0.1, 10%%)",
+        type=float,
+        default=0.1,
+    )
+
+    bench.add_argument(
+        "--alpha",
+        dest="alpha",
+        help="significance level for a slowdown (defaults to 0.05)",
+        type=float,
+        default=0.05,
+    )
+
+    bench.add_argument(
+        "--parallel",
+        dest="parallel",
+        help="run benchmarks in parallel (default is serial, which is less noisy)",
+        default=False,
+        action="store_true",
+    )
+
+    bench.add_argument(
+        "--nproc",
+        help="number of processes for --parallel (defaults to 2*ncores + 1)",
+        type=int,
+    )
+
+    bench.add_argument(
+        "--pattern", help="match a pattern to filter testing", type=str, default=None,
+    )
+
     # Shell into interactive environment to run tests
     shell = subparsers.add_parser(
         "shell", help="shell into an interactive console with gridtest"
@@ -249,6 +425,18 @@ def get_parser():
             default=False,
             action="store_true",
         )
+        group.add_argument(
+            "--import",
+            dest="use_import",
+            help="import modules to find functions, instead of parsing source",
+            default=False,
+            action="store_true",
+        )
+        group.add_argument(
+            "--nproc",
+            help="number of processes for parsing files (defaults to ncores)",
+            type=int,
+        )
 
     return parser
 
@@ -285,10 +473,14 @@ def main():
     # Does the user want a shell?
     if args.command == "test":
         from .test import main
+    elif args.command == "bench":
+        from .bench import main
     elif args.command == "generate":
         from .generate import main
     elif args.command == "gridview":
         from .gridview import main
+    elif args.command == "serve":
+        from .serve import main
     elif args.command == "shell":
         from .shell import main
     elif args.command == "check":
@@ -0,0 +1,41 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+from gridtest.main.test import GridRunner
+from gridtest.main.bench import (
+    run_benchmarks,
+    save_baseline,
+    read_baseline,
+    compare_baseline,
+    print_comparison,
+)
+import sys
+
+
+def main(args, extra):
+
+    # Read the baseline first, to exit early if it's missing
+    baseline = {"tests": {}}
+    if args.baseline:
+        baseline = read_baseline(args.baseline)
+
+    runner = GridRunner(args.filename)
+    tests = run_benchmarks(
+        runner, regexp=args.pattern, parallel=args.parallel, nproc=args.nproc
+    )
+
+    comparisons = compare_baseline(
+        baseline, tests, tolerance=args.tolerance, alpha=args.alpha
+    )
+    return_code = print_comparison(comparisons)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, tests)
+    sys.exit(return_code)
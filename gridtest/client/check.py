@@ -23,4 +23,6 @@ def main(args, extra):
         include_private=args.include_private,
         include_classes=not args.skip_classes,
         skip_patterns=args.skip_patterns,
+        static=not args.use_import,
+        nproc=args.nproc,
     )
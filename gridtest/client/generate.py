@@ -31,4 +31,6 @@ def main(args, extra):
         include_private=args.include_private,
         include_classes=not args.skip_classes,
         force=args.force,
+        static=not args.use_import,
+        nproc=args.nproc,
     )
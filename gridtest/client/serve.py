@@ -0,0 +1,23 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+from gridtest.main.server import GridServer
+
+
+def main(args, extra):
+
+    server = GridServer(socket_path=args.socket, nproc=args.nproc, preload=args.preload)
+    server.open()
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
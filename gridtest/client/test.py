@@ -8,13 +8,58 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 """
 
-from gridtest.main.test import GridRunner
+import os
 import sys
 
 
 def main(args, extra):
 
+    # Submit the run to a server (without importing the runner here)
+    if args.server:
+        from gridtest.main.server import submit
+
+        if args.interactive:
+            sys.exit("Interactive tests cannot be run with --server.")
+
+        # The server runs with its own pool, and one run per request
+        for flag in ["serial", "nproc", "name", "watch"]:
+            if getattr(args, flag):
+                sys.exit(f"--{flag} cannot be used with --server.")
+        request = {
+            "input_file": os.path.abspath(args.filename),
+            "verbose": args.verbose,
+            "regexp": args.pattern,
+            "cleanup": not args.no_cleanup,
+            "save_compact": args.save_compact,
+            "report_template": args.report_template,
+            "incremental": args.incremental,
+            "prune_cache": args.prune_cache,
+            "last_failed": args.last_failed,
+            "failed_first": args.failed_first,
+            "scaling": args.scaling,
+            "scaling_metric": args.scaling_metric,
+            "scaling_limit": args.scaling_limit,
+            "group_by": args.group_by,
+        }
+        for key in ["save", "save_report", "save_metrics", "profile"]:
+            value = getattr(args, key)
+            request[key] = os.path.abspath(value) if value else None
+        sys.exit(submit(request, args.socket))
+
+    from gridtest.main.test import GridRunner
+
     runner = GridRunner(args.filename)
+    if args.watch:
+        sys.exit(
+            runner.watch(
+                nproc=args.nproc,
+                parallel=not args.serial,
+                verbose=args.verbose,
+                regexp=args.pattern,
+                cleanup=not args.no_cleanup,
+            )
+        )
+
     return_code = runner.run(
         nproc=args.nproc,
         parallel=not args.serial,
@@ -28,5 +73,14 @@ def main(args, extra):
         save_report=args.save_report,
         report_template=args.report_template,
         save_metrics=args.save_metrics,
+        incremental=args.incremental,
+        prune_cache=args.prune_cache,
+        last_failed=args.last_failed,
+        failed_first=args.failed_first,
+        profile=args.profile,
+        scaling=args.scaling,
+        scaling_metric=args.scaling_metric,
+        scaling_limit=args.scaling_limit,
+        group_by=args.group_by,
     )
     sys.exit(return_code)
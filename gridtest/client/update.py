@@ -23,4 +23,6 @@ def main(args, extra):
         args.input,
         include_private=args.include_private,
         include_classes=not args.skip_classes,
+        static=not args.use_import,
+        nproc=args.nproc,
     )
@@ -15,26 +15,347 @@ it will work to reference the function here.
 """
 
 
+from gridtest.defaults import (
+    GRIDTEST_ALLOCATION_SITES,
+    GRIDTEST_BENCH_GC,
+    GRIDTEST_BENCH_ROUNDS,
+    GRIDTEST_BENCH_TIME,
+    GRIDTEST_BENCH_WARMUP,
+)
+from gridtest.main.stats import describe
 import time
+import sys
+import gc
+import os
+
+# Values recorded by metric decorators for the running test, by metric name
+recorded = None
+
+# Where @profile saves stats for the running test (None doesn't save them)
+profile_file = None
+
+
+def start_metrics(profile=None):
+    """start collecting metric values for a test (called by test_basic).
+
+       Arguments:
+        - profile (str) : if defined, the file for @profile to save stats to
+    """
+    global recorded, profile_file
+    recorded = {}
+    profile_file = profile
+
+
+def finish_metrics():
+    """stop collecting metric values, and return the values recorded for the
+       test, a lookup of metric names and lists of values.
+    """
+    global recorded, profile_file
+    values = recorded or {}
+    recorded = None
+    profile_file = None
+    return values
+
+
+def record_metric(name, value):
+    """record a value for a metric (e.g., @timeit) for the running test. The
+       value is returned with the test as is, so it should be a number,
+       string, boolean, or None (something that can be saved). If a test
+       isn't running (e.g., the decorated function is called directly) the
+       value is printed instead.
+
+       Arguments:
+        - name (str) : the name of the metric, e.g., @timeit
+        - value (object) : the value to record
+    """
+    if recorded is None:
+        print(f"{name} {value}")
+        return
+    recorded.setdefault(name, []).append(value)
 
 
 def timeit(func):
     """timeit is a well known Python decorator that will time the total execution
-       time for a function. Any output to return to the calling function should
-       be printed to stdout, and prefixed with the name of the objective (e.g.,
-       @timeit).
+       time for a function (one call). The time is recorded in milliseconds.
     """
 
     def timed(*args, **kwargs):
-        ts = time.time()
+        ts = time.perf_counter_ns()
         result = func(*args, **kwargs)
-        te = time.time()
-        print("@timeit  %2.2f ms" % ((te - ts) * 1000))
+        te = time.perf_counter_ns()
+        record_metric("@timeit", (te - ts) / 1e6)
         return result
 
     return timed
 
 
+def benchmark(func):
+    """benchmark times a function more carefully than timeit. After warmup
+       calls, the number of loops is calibrated (as with timeit.autorange)
+       so a round of calls takes at least GRIDTEST_BENCH_TIME seconds, and
+       rounds are timed with garbage collection disabled (unless
+       GRIDTEST_BENCH_GC is set). The min, median, mean, stdev and p95 of
+       the time for one call (ms) across rounds are recorded, along with
+       the number of loops and rounds. The function is called many times,
+       so it shouldn't have side effects that change later calls.
+    """
+
+    def wrapper(*args, **kwargs):
+        for _ in range(GRIDTEST_BENCH_WARMUP):
+            func(*args, **kwargs)
+
+        enabled = gc.isenabled()
+        if not GRIDTEST_BENCH_GC:
+            gc.disable()
+        try:
+            loops = get_loops(func, args, kwargs, GRIDTEST_BENCH_TIME)
+            times = []
+            for _ in range(max(1, GRIDTEST_BENCH_ROUNDS)):
+                ts = time.perf_counter_ns()
+                for _ in range(loops):
+                    result = func(*args, **kwargs)
+                te = time.perf_counter_ns()
+                times.append((te - ts) / loops / 1e6)
+        finally:
+            if enabled:
+                gc.enable()
+
+        for name, value in describe(times).items():
+            record_metric("@benchmark.%s" % name, value)
+        record_metric("@benchmark.loops", loops)
+        record_metric("@benchmark.rounds", len(times))
+        return result
+
+    return wrapper
+
+
+def get_loops(func, args, kwargs, min_time):
+    """return the number of loops (1, 2, 5, 10, 20, 50, ...) for calls to a
+       function to take at least min_time seconds, as timeit.autorange does.
+    """
+    loops = 1
+    while True:
+        for factor in [1, 2, 5]:
+            number = loops * factor
+            ts = time.perf_counter_ns()
+            for _ in range(number):
+                func(*args, **kwargs)
+            if time.perf_counter_ns() - ts >= min_time * 1e9:
+                return number
+        loops *= 10
+
+
+def peakmem(func):
+    """peakmem records the increase in peak resident memory (bytes) of the
+       process while the function runs. On Linux the peak is reset before the
+       call, otherwise (or if it can't be reset) it's the increase above the
+       peak before the call, which is 0 if the call used less memory than
+       something that ran before it in the same process.
+    """
+
+    def wrapper(*args, **kwargs):
+        before = reset_peak_rss()
+        result = func(*args, **kwargs)
+        record_metric("@peakmem", max(0, get_peak_rss() - before))
+        return result
+
+    return wrapper
+
+
+def read_status():
+    """return a lookup of memory values (bytes) from /proc/self/status (e.g.,
+       VmRSS and VmHWM, the current and peak resident memory) or an empty
+       lookup if it isn't available (not Linux).
+    """
+    status = {}
+    try:
+        with open("/proc/self/status", "r") as fd:
+            for line in fd:
+                if line.startswith("Vm") and line.rstrip().endswith("kB"):
+                    key, value = line.split(":", 1)
+                    status[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return status
+
+
+def get_peak_rss():
+    """return the peak resident memory (bytes) of the process, or 0 if it
+       can't be found.
+    """
+    status = read_status()
+    if "VmHWM" in status:
+        return status["VmHWM"]
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return 0
+
+    # ru_maxrss is in bytes on macOS, and kilobytes otherwise
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_rss():
+    """reset the peak resident memory of the process to the current (Linux)
+       and return the value to measure an increase from, the current resident
+       memory if it was reset, otherwise the peak.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fd:
+            fd.write("5")
+        return read_status()["VmRSS"]
+    except (OSError, KeyError):
+        return get_peak_rss()
+
+
+def allocations(func):
+    """allocations traces memory allocated by Python (tracemalloc) while the
+       function runs, and records the peak (bytes) and number of blocks still
+       allocated when it returns as @allocations.peak and .blocks. The top
+       allocation sites (file, line, and bytes) for memory still allocated are
+       recorded as .sites. Tracing has a high overhead, so this shouldn't be
+       combined with timing metrics.
+    """
+
+    def wrapper(*args, **kwargs):
+        import tracemalloc
+
+        # If already tracing, the peak can only be reset with Python 3.9+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+        try:
+            before = tracemalloc.take_snapshot()
+            result = func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        exclude = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        stats = after.filter_traces(exclude).compare_to(
+            before.filter_traces(exclude), "lineno"
+        )
+        record_metric("@allocations.peak", peak)
+        record_metric("@allocations.blocks", sum(x.count_diff for x in stats))
+        for stat in stats[:GRIDTEST_ALLOCATION_SITES]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            record_metric(
+                "@allocations.sites",
+                "%s:%s %s"
+                % (os.path.basename(frame.filename), frame.lineno, stat.size_diff),
+            )
+        return result
+
+    return wrapper
+
+
+def profile(func):
+    """profile runs the function with cProfile, and records the number of
+       function calls (@profile.calls), the total time in seconds
+       (@profile.seconds), and the function with the most time spent in it
+       (@profile.top). With gridtest test --profile <dir>, the stats are also
+       saved to a .pstats file for the test, to be merged per function.
+    """
+
+    def wrapper(*args, **kwargs):
+        from gridtest.main.profiles import get_hotspots
+        import cProfile
+        import pstats
+
+        filename = profile_file
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args, **kwargs)
+
+        if filename:
+            profiler.dump_stats(filename)
+        stats = pstats.Stats(profiler)
+        record_metric("@profile.calls", stats.total_calls)
+        record_metric("@profile.seconds", stats.total_tt)
+        for hotspot in get_hotspots(stats, 1):
+            record_metric("@profile.top", hotspot[0])
+        return result
+
+    return wrapper
+
+
+def resources(func):
+    """resources records the resources used by the process (and any child
+       processes it waits for) while the function runs, from getrusage and
+       /proc/self/io (Linux). This includes user and system cpu time (seconds),
+       the fraction of wall time spent on the cpu (@resources.cpu, near 1 for
+       a cpu bound call and near 0 for one that is waiting), voluntary and
+       involuntary context switches, major and minor page faults, and bytes
+       read and written to storage (read_bytes, write_bytes) or by any read
+       or write (read_chars, write_chars).
+    """
+
+    def wrapper(*args, **kwargs):
+        before = get_resources()
+        ts = time.perf_counter()
+        result = func(*args, **kwargs)
+        wall = time.perf_counter() - ts
+        after = get_resources()
+
+        used = {key: after[key] - before[key] for key in after if key in before}
+        if "user" in used:
+            used["cpu"] = (used["user"] + used["system"]) / wall if wall else 0.0
+        used["wall"] = wall
+        for key, value in used.items():
+            record_metric("@resources.%s" % key, value)
+        return result
+
+    return wrapper
+
+
+def get_resources():
+    """return a lookup of resources used so far by the process and the child
+       processes it has waited for (getrusage), and io counters (Linux).
+    """
+    usage = {}
+    try:
+        import resource
+
+        for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+            rusage = resource.getrusage(who)
+            for key, field in [
+                ("user", "ru_utime"),
+                ("system", "ru_stime"),
+                ("voluntary_switches", "ru_nvcsw"),
+                ("involuntary_switches", "ru_nivcsw"),
+                ("major_faults", "ru_majflt"),
+                ("minor_faults", "ru_minflt"),
+            ]:
+                usage[key] = usage.get(key, 0) + getattr(rusage, field)
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/io", "r") as fd:
+            counters = dict(line.split(":", 1) for line in fd if ":" in line)
+        for key, field in [
+            ("read_bytes", "read_bytes"),
+            ("write_bytes", "write_bytes"),
+            ("read_chars", "rchar"),
+            ("write_chars", "wchar"),
+        ]:
+            usage[key] = int(counters[field])
+    except (OSError, KeyError, ValueError):
+        pass
+    return usage
+
+
 def length(func):
     """calculate the length of a result, None if it doesn't have length
     """
@@ -44,20 +365,24 @@ def length(func):
         try:
             length = len(result)
         except:
-            length = ""
-        print(f"@length {length}")
+            length = None
+        record_metric("@length", length)
         return result
 
     return wrapper
 
 
 def result(func):
-    """result will simply capture the result (as a decorator).
+    """result will simply capture the result (as a decorator). Results that
+       aren't a number, string, boolean, or None are recorded as a string.
     """
 
     def wrapper(*args, **kwargs):
         result = func(*args, **kwargs)
-        print(f"@result {result}")
+        if isinstance(result, (int, float, str, bool)) or result is None:
+            record_metric("@result", result)
+        else:
+            record_metric("@result", str(result))
         return result
 
     return wrapper
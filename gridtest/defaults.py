@@ -9,7 +9,7 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 from gridtest.logger import bot
-import multiprocessing
+import getpass
 import os
 import sys
 
@@ -36,11 +36,64 @@ def getenv(variable_key, default=None, required=False, silent=True):
     return variable
 
 
-GRIDTEST_NPROC = multiprocessing.cpu_count()
+GRIDTEST_NPROC = os.cpu_count() or 1
 GRIDTEST_WORKERS = int(getenv("GRIDTEST_WORKERS", GRIDTEST_NPROC * 2 + 1))
 GRIDTEST_SHELL = getenv("GRIDTEST_SHELL", "ipython")
 GRIDTEST_RETURNTYPES = ["raises", "returns", "exists", "istrue", "isfalse"]
 GRIDTEST_GRIDEXPANDERS = ["min", "max", "by", "list"]
 
+# Test ids are derived from the function, argset, and these checks
+GRIDTEST_CHECKS = GRIDTEST_RETURNTYPES + ["equals", "isinstance", "success"]
+GRIDTEST_ID_LENGTH = 12
+
+# Streaming results are flushed and synced every N records or seconds
+GRIDTEST_SYNC_EVERY = int(getenv("GRIDTEST_SYNC_EVERY", 1000))
+GRIDTEST_SYNC_SECONDS = float(getenv("GRIDTEST_SYNC_SECONDS", 5))
+
+# Columnar metrics exports write this many rows at once
+GRIDTEST_ROW_GROUP = int(getenv("GRIDTEST_ROW_GROUP", 10000))
+
+# Web reports write data in pages of this many tests
+GRIDTEST_REPORT_PAGE = int(getenv("GRIDTEST_REPORT_PAGE", 1000))
+
+# Incremental run and failed test state (defaults to .gridtest_cache by test file)
+GRIDTEST_CACHE_DIR = getenv("GRIDTEST_CACHE_DIR")
+
+# With --watch, seconds to wait between checks for changed files
+GRIDTEST_WATCH_INTERVAL = float(getenv("GRIDTEST_WATCH_INTERVAL", 0.25))
+
+# gridtest serve listens on (and gridtest test --server connects to) this socket
+GRIDTEST_SOCKET = getenv(
+    "GRIDTEST_SOCKET",
+    os.path.join(
+        os.environ.get("TMPDIR", "/tmp"), "gridtest-%s.sock" % getpass.getuser()
+    ),
+)
+
+# Gridtest files at least this many bytes keep a parsed copy in the cache
+GRIDTEST_CONFIG_CACHE_SIZE = int(getenv("GRIDTEST_CONFIG_CACHE_SIZE", 65536))
+
+# Serializer for results and metrics (auto, json, orjson, json_tricks, msgpack)
+GRIDTEST_SERIALIZER = getenv("GRIDTEST_SERIALIZER", "auto")
+
+# What a worker sends back to the parent for a test result (default is keep)
+GRIDTEST_RESULT_POLICIES = ["keep", "digest", "discard"]
+
+# What a worker keeps of the stdout and stderr of a test (default is keep). Up to
+# this many characters are kept for each, half from the start and half from the end
+GRIDTEST_OUTPUT_POLICIES = ["keep", "spill", "discard"]
+GRIDTEST_OUTPUT = getenv("GRIDTEST_OUTPUT", "keep")
+GRIDTEST_OUTPUT_SIZE = int(getenv("GRIDTEST_OUTPUT_SIZE", 65536))
+
+# The @benchmark metric runs warmup calls, then rounds of a number of loops
+# calibrated to take at least this many seconds, with garbage collection off
+GRIDTEST_BENCH_WARMUP = int(getenv("GRIDTEST_BENCH_WARMUP", 1))
+GRIDTEST_BENCH_ROUNDS = int(getenv("GRIDTEST_BENCH_ROUNDS", 5))
+GRIDTEST_BENCH_TIME = float(getenv("GRIDTEST_BENCH_TIME", 0.05))
+GRIDTEST_BENCH_GC = getenv("GRIDTEST_BENCH_GC", "false").lower() in ["1", "true", "yes"]
+
+# The @allocations metric records this many of the top allocation sites
+GRIDTEST_ALLOCATION_SITES = int(getenv("GRIDTEST_ALLOCATION_SITES", 3))
+
 # Known default functions
 GRIDTEST_FUNCS = ["tmp_dir", "tmp_path"]
@@ -0,0 +1,186 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+gridtest.main.bench runs the tests of a gridtest file as benchmarks (with the
+@benchmark metric) and saves the timings as a baseline, or compares them to a
+baseline to find significant slowdowns.
+
+"""
+
+from gridtest.defaults import GRIDTEST_WORKERS
+from gridtest.main.stats import welch_test
+from gridtest.utils import write_json
+from gridtest.logger import bot
+from gridtest import __version__
+import platform
+import json
+import time
+import os
+
+
+def run_benchmarks(
+    runner, regexp=None, parallel=False, nproc=None, verbose=False, cleanup=True
+):
+    """Run the tests for a runner with the @benchmark metric added, and return
+       the lookup of finished tests. Tests are run in serial by default, as
+       parallel workers compete for the same cores and add noise, and output
+       is discarded unless a test sets an output policy.
+
+       Arguments:
+        - runner (gridtest.main.test.GridRunner) : the runner with tests
+        - regexp (str) : if supplied, filter to this pattern
+        - parallel (bool) : run benchmarks with multiprocessing (False)
+        - nproc (int) : number of processes to use for parallel runs
+        - verbose (bool) : print success output too
+        - cleanup (bool) : cleanup files/directories generated with tmp_path tmp_dir
+    """
+    runner.show_progress = True
+    runner.get_grids()
+    tests = runner.get_tests(regexp=regexp, verbose=verbose, cleanup=cleanup)
+    if not tests:
+        bot.exit_info("No tests to run.")
+
+    # Other metrics would be timed along with the function, so they aren't run
+    for name, test in tests.items():
+        test.params["metrics"] = ["@benchmark"]
+        test.params.setdefault("output", "discard")
+
+    runner.run_tests(tests, parallel=parallel, nproc=nproc or GRIDTEST_WORKERS)
+    return tests
+
+
+def get_timing(test):
+    """return the timing (mean, stdev, and rounds, with times in ms) recorded
+       by @benchmark for a test, or None if it failed or has no timing.
+    """
+    values = [test.metrics.get("@benchmark.%s" % key) for key in ["mean", "stdev"]]
+    rounds = test.metrics.get("@benchmark.rounds")
+    if not test.success or not all(values) or not rounds:
+        return None
+    return {"mean": values[0][0], "stdev": values[1][0], "rounds": rounds[0]}
+
+
+def save_baseline(filename, tests):
+    """save the timings of finished benchmarks to a baseline (json) file,
+       keyed by test name, along with the machine and python they ran on.
+
+       Arguments:
+        - filename (str) : the json file to write
+        - tests (dict) : the lookup of finished tests, keyed by name
+    """
+    baseline = {
+        "version": __version__,
+        "created": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "tests": {},
+    }
+    for name, test in tests.items():
+        timing = get_timing(test)
+        if timing:
+            timing.update({"function": test.name, "args": test.raw_args})
+            baseline["tests"][name] = timing
+
+    write_json(baseline, filename)
+    bot.info(f"Saved baseline for {len(baseline['tests'])} tests to {filename}")
+    return filename
+
+
+def read_baseline(filename):
+    """read a baseline file saved by save_baseline, and warn if it was saved
+       with another python or machine, as timings may not be comparable.
+    """
+    if not os.path.exists(filename):
+        bot.exit(f"{filename} does not exist.")
+    with open(filename, "r") as fd:
+        baseline = json.loads(fd.read())
+
+    for key, value in [
+        ("python", platform.python_version()),
+        ("machine", platform.platform()),
+    ]:
+        if baseline.get(key) != value:
+            bot.warning(f"Baseline {key} {baseline.get(key)} is not {value}.")
+    return baseline
+
+
+def compare_baseline(baseline, tests, tolerance=0.1, alpha=0.05):
+    """compare finished benchmarks to a baseline. A test is slower (a
+       regression) if its mean time is more than tolerance (a fraction) above
+       the baseline, and Welch's t-test finds the difference significant at
+       alpha. Faster is the same in the other direction. A test can set its
+       own tolerance with a tolerance key. Returns a list of comparisons.
+
+       Arguments:
+        - baseline (dict) : the baseline from read_baseline
+        - tests (dict) : the lookup of finished tests, keyed by name
+        - tolerance (float) : the allowed slowdown, e.g., 0.1 for 10%
+        - alpha (float) : the significance level for the t-test
+    """
+    comparisons = []
+    for name, test in tests.items():
+        timing = get_timing(test)
+        before = baseline["tests"].get(name)
+        comparison = {"name": name, "before": before, "after": timing}
+
+        if not timing:
+            comparison["status"] = "failed"
+        elif not before:
+            comparison["status"] = "new"
+        else:
+            allowed = float(test.params.get("tolerance", tolerance))
+            ratio = timing["mean"] / before["mean"] if before["mean"] else 1.0
+            samples = [(x["mean"], x["stdev"], x["rounds"]) for x in [before, timing]]
+            comparison["ratio"] = ratio
+            comparison["status"] = "same"
+            if ratio > 1 + allowed and welch_test(*samples) < alpha:
+                comparison["status"] = "slower"
+            elif ratio < 1 / (1 + allowed) and welch_test(*reversed(samples)) < alpha:
+                comparison["status"] = "faster"
+        comparisons.append(comparison)
+    return comparisons
+
+
+def print_comparison(comparisons):
+    """print a comparison to a baseline, with slower tests in red and faster
+       in green, and return 1 if any test is slower or failed, 0 otherwise.
+    """
+    print(
+        "\n{:<40} {:>12} {:>12} {:>9}  {:<10}".format(
+            "Name", "Before (ms)", "After (ms)", "Change", "Status"
+        )
+    )
+    print("{:_<90}".format(""))
+
+    counts = {}
+    for comparison in comparisons:
+        status = comparison["status"]
+        counts[status] = counts.get(status, 0) + 1
+        before = comparison["before"]["mean"] if comparison["before"] else None
+        after = comparison["after"]["mean"] if comparison["after"] else None
+        change = ""
+        if "ratio" in comparison:
+            change = "%+.1f%%" % ((comparison["ratio"] - 1) * 100)
+        line = "{:<40} {:>12} {:>12} {:>9}  {:<10}".format(
+            comparison["name"],
+            "%.6g" % before if before is not None else "",
+            "%.6g" % after if after is not None else "",
+            change,
+            status,
+        )
+        if status in ["slower", "failed"]:
+            bot.failure(line)
+        elif status == "faster":
+            bot.success(line)
+        else:
+            print(line)
+
+    print("\n" + ", ".join("%s %s" % (v, k) for k, v in sorted(counts.items())))
+    if counts.get("slower") or counts.get("failed"):
+        return 1
+    return 0
@@ -0,0 +1,410 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+from gridtest.defaults import GRIDTEST_CHECKS, GRIDTEST_CONFIG_CACHE_SIZE
+from gridtest.utils import load_yaml
+from gridtest.logger import bot
+from gridtest.serialize import to_serializable
+from gridtest import __version__
+import importlib.util
+import hashlib
+import pickle
+import json
+import ast
+import time
+import os
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    value BLOB,
+    created REAL,
+    used REAL
+);
+CREATE INDEX IF NOT EXISTS cache_used ON cache(used);
+"""
+
+# Source digests are calculated once per file for a process
+source_digests = {}
+
+
+def get_module_path(module, filename=None):
+    """Given a module name and a filename (which might be a file, or also a
+       module name) return a path to the source file, or None if not found.
+    """
+    if filename and os.path.isfile(filename):
+        return os.path.abspath(filename)
+    try:
+        spec = importlib.util.find_spec(filename or module)
+    except (ImportError, ValueError):
+        return None
+    if spec and spec.origin and os.path.isfile(spec.origin):
+        return spec.origin
+
+
+def get_local_imports(filename, content):
+    """Given a source file and its content, return paths for modules it
+       imports that are found alongside it (in the same directory), which is
+       where a change is likely to affect the functions being tested.
+    """
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return []
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+            names.update("%s.%s" % (node.module, x.name) for x in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names.update(alias.name for alias in node.names)
+
+    paths = []
+    dirname = os.path.dirname(filename)
+    for name in names:
+        base = os.path.join(dirname, *name.split("."))
+        for path in [base + ".py", os.path.join(base, "__init__.py")]:
+            if os.path.isfile(path):
+                paths.append(path)
+    return paths
+
+
+def get_source_digest(filename, seen=None):
+    """Return a digest of the source of a file, and (transitively) of the
+       local modules that it imports. Digests are cached for the process.
+
+       Arguments:
+        - filename (str) : the path to the python source file
+        - seen (set) : files already included (to avoid import cycles)
+    """
+    filename = os.path.abspath(filename)
+    if filename in source_digests:
+        return source_digests[filename]
+
+    seen = seen or set()
+    seen.add(filename)
+
+    with open(filename, "rb") as fd:
+        content = fd.read()
+
+    digest = hashlib.sha256(content)
+    for path in sorted(get_local_imports(filename, content)):
+        if os.path.abspath(path) not in seen:
+            digest.update(get_source_digest(path, seen).encode("utf-8"))
+
+    source_digests[filename] = digest.hexdigest()
+    return source_digests[filename]
+
+
+def get_test_id(test):
+    """Given a test, return a stable id derived from the function name, the
+       argset (before substitution), and the checks, so that the same test
+       has the same id between runs regardless of its position in a grid.
+
+       Arguments:
+        - test (gridtest.main.test.GridTest) : the test to derive an id for
+    """
+    checks = {key: test.params[key] for key in GRIDTEST_CHECKS if key in test.params}
+    spec = json.dumps(
+        {"function": test.name, "args": test.raw_args, "checks": checks},
+        sort_keys=True,
+        default=to_serializable,
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+def read_failed(cache_dir):
+    """read the state file of failed tests from the last run, a lookup of
+       test ids and test names. Returns an empty lookup if not found.
+
+       Arguments:
+        - cache_dir (str) : the cache directory with the state file
+    """
+    filename = os.path.join(cache_dir, "lastfailed.json")
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, "r") as fd:
+        return json.loads(fd.read())
+
+
+def write_failed(cache_dir, tests):
+    """update the state file of failed tests. Failures from tests that were
+       not run this time are kept, and tests that were run are updated. The
+       file is only written if there are failures, or it already exists.
+
+       Arguments:
+        - cache_dir (str) : the cache directory with the state file
+        - tests (dict) : the lookup of finished tests, keyed by name
+    """
+    failed = read_failed(cache_dir)
+    for name, test in tests.items():
+        if test.success:
+            failed.pop(test.id, None)
+        else:
+            failed[test.id] = name
+
+    filename = os.path.join(cache_dir, "lastfailed.json")
+    if not failed and not os.path.exists(filename):
+        return
+    try:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        with open(filename, "w") as fd:
+            fd.write(json.dumps(failed, indent=4))
+    except OSError:
+        bot.warning(f"Cannot write failed tests to {filename}")
+    return filename
+
+
+def read_config(filename, cache_dir):
+    """read a gridtest file, keeping a parsed (pickled) copy in the cache
+       directory for large files. The copy is used if the file has the same
+       modified time and size, or otherwise the same content (sha256), so an
+       unchanged file doesn't need to be parsed again.
+
+       Arguments:
+        - filename (str) : the gridtest yaml file to read
+        - cache_dir (str) : the cache directory for the parsed copy
+    """
+    stat = os.stat(filename)
+    if stat.st_size < GRIDTEST_CONFIG_CACHE_SIZE:
+        with open(filename, "r") as fd:
+            return load_yaml(fd.read())
+
+    name = hashlib.sha256(os.path.abspath(filename).encode("utf-8")).hexdigest()
+    cache_file = os.path.join(cache_dir, "config-%s.pkl" % name[:16])
+    mtime = (stat.st_mtime_ns, stat.st_size)
+
+    cached = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as fd:
+                cached = pickle.load(fd)
+        except Exception:
+            bot.debug(f"Cannot read cached config {cache_file}")
+
+    if cached and cached["version"] == __version__ and cached["mtime"] == mtime:
+        return cached["config"]
+
+    with open(filename, "rb") as fd:
+        content = fd.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if cached and cached["version"] == __version__ and cached["digest"] == digest:
+        config = cached["config"]
+    else:
+        config = load_yaml(content)
+
+    cached = {"version": __version__, "mtime": mtime, "digest": digest}
+    cached["config"] = config
+    try:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        with open(cache_file, "wb") as fd:
+            pickle.dump(cached, fd, protocol=pickle.HIGHEST_PROTOCOL)
+    except (OSError, pickle.PicklingError):
+        bot.debug(f"Cannot write cached config {cache_file}")
+    return config
+
+
+def read_extracted(cache_dir):
+    """read the lookup of functions extracted from source files by a previous
+       generate, check, or update, keyed by the file and extraction options.
+       Each entry has the modified time and size of the file when it was
+       parsed. Returns an empty lookup if not found, or for another version.
+
+       Arguments:
+        - cache_dir (str) : the cache directory with the extracted functions
+    """
+    filename = os.path.join(cache_dir, "extracted.pkl")
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename, "rb") as fd:
+            cached = pickle.load(fd)
+    except Exception:
+        bot.debug(f"Cannot read extracted functions {filename}")
+        return {}
+    if cached.get("version") != __version__:
+        return {}
+    return cached["files"]
+
+
+def write_extracted(cache_dir, extracted):
+    """write the lookup of extracted functions, leaving out files that no
+       longer exist. The file is written to a temporary name and moved, so
+       a run at the same time doesn't read a partial file.
+
+       Arguments:
+        - cache_dir (str) : the cache directory for the extracted functions
+        - extracted (dict) : the lookup from read_extracted, updated
+    """
+    filename = os.path.join(cache_dir, "extracted.pkl")
+    files = {key: entry for key, entry in extracted.items() if os.path.exists(key[0])}
+    try:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        tmpfile = "%s.%s" % (filename, os.getpid())
+        with open(tmpfile, "wb") as fd:
+            pickle.dump(
+                {"version": __version__, "files": files},
+                fd,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmpfile, filename)
+    except (OSError, pickle.PicklingError):
+        bot.debug(f"Cannot write extracted functions {filename}")
+    return filename
+
+
+def get_cache_key(test):
+    """Given a test, return a key that changes if the source of the function
+       (or the local modules it imports), the arguments, the checks, or the
+       version of gridtest change. If the source can't be found, return None
+       to indicate that the test can't be cached.
+
+       Arguments:
+        - test (gridtest.main.test.GridTest) : the test to derive a key for
+    """
+    path = get_module_path(test.module, test.filename)
+    if not path:
+        return None
+
+    params = dict(test.params)
+    params["args"] = test.raw_args
+    spec = json.dumps(
+        {"name": test.name, "module": test.module, "params": params},
+        sort_keys=True,
+        default=to_serializable,
+    )
+    digest = hashlib.sha256(__version__.encode("utf-8"))
+    digest.update(get_source_digest(path).encode("utf-8"))
+    digest.update(spec.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultsCache:
+    def __init__(self, cache_dir):
+        """A results cache keeps the outcome of tests keyed by get_cache_key,
+           so that a test that hasn't changed doesn't need to be run again.
+
+           Arguments:
+            - cache_dir (str) : the cache directory to use (created if needed)
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.filename = os.path.join(self.cache_dir, "cache.sqlite")
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        import sqlite3
+
+        self.conn = sqlite3.connect(self.filename)
+        self.conn.executescript(SCHEMA)
+
+    def load(self, tests, batch_size=500):
+        """Given a lookup of tests, restore those found in the cache and return
+           the lookup of tests that still need to be run.
+
+           Arguments:
+            - tests (dict) : the lookup of tests, keyed by name
+            - batch_size (int) : the number of keys to look up at once
+        """
+        keys = {}
+        for name, test in tests.items():
+            test.cache_key = get_cache_key(test)
+            if test.cache_key:
+                keys.setdefault(test.cache_key, []).append(test)
+
+        found = set()
+        now = time.time()
+        unique = list(keys)
+        for start in range(0, len(unique), batch_size):
+            batch = unique[start : start + batch_size]
+            rows = self.conn.execute(
+                "SELECT key, value FROM cache WHERE key IN (%s)"
+                % ",".join("?" * len(batch)),
+                batch,
+            ).fetchall()
+            for key, value in rows:
+                state = pickle.loads(value)
+                for test in keys[key]:
+                    test.set_state(state)
+                found.add(key)
+
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE cache SET used = ? WHERE key = ?", [(now, k) for k in found]
+            )
+
+        torun = {
+            name: test
+            for name, test in tests.items()
+            if not test.cache_key or test.cache_key not in found
+        }
+        self.hits += len(tests) - len(torun)
+        self.misses += len(torun)
+        return torun
+
+    def save(self, tests):
+        """save the outcome of finished tests to the cache. Tests that can't
+           be cached (no key) or pickled are skipped.
+
+           Arguments:
+            - tests (dict) : the lookup of finished tests, keyed by name
+        """
+        now = time.time()
+        rows = []
+        for name, test in tests.items():
+            if not getattr(test, "cache_key", None):
+                continue
+            try:
+                value = pickle.dumps(test.get_state())
+            except Exception:
+                bot.debug(f"Cannot cache {name}, result cannot be pickled.")
+                continue
+            rows.append((test.cache_key, test.name, value, now, now))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def prune(self, older_than):
+        """remove entries from the cache that haven't been used since a time.
+
+           Arguments:
+            - older_than (float) : remove entries last used before this time
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM cache WHERE used < ?", (older_than,)
+            )
+        return cursor.rowcount
+
+    def summary(self):
+        """return a summary of cache hits for the user.
+        """
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return "cache: %s/%s tests reused (%.1f%% hit rate)" % (self.hits, total, rate)
+
+    def close(self):
+        self.conn.close()
+
+    def __repr__(self):
+        return "[results-cache|%s]" % self.cache_dir
+
+    def __str__(self):
+        return "[results-cache|%s]" % self.cache_dir
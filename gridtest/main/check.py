@@ -9,14 +9,79 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 from gridtest.main.test import GridRunner
-from gridtest.main.generate import extract_functions, extract_modulename
+from gridtest.main.generate import extract_files, extract_modulename
 import os
 import re
 import sys
 
 
+class TestNames:
+    def __init__(self, names=None, skip_patterns=None):
+        """A lookup of existing test names for a section (one file or module),
+           to check if a function extracted from it already has a test. The
+           same function can be named by different import paths (e.g.,
+           tests.modules.basic.add or basic.add) so names match if one ends
+           with the other at a dot, as long as only one existing name ends
+           with it (otherwise the full name must match). Each name is indexed
+           by its suffixes, so checking a name doesn't depend on the number of
+           tests. A name also matches if it ends with a (regular expression)
+           skip pattern.
+
+           Arguments:
+            - names (list) : existing test names to add
+            - skip_patterns (list) : list of test keys (patterns) to exclude
+        """
+        self.names = set()
+        self.suffixes = {}
+        self.skip = None
+        if skip_patterns:
+            try:
+                self.skip = re.compile("(%s)$" % "|".join(skip_patterns))
+            except re.error as exc:
+                sys.exit(f"Invalid skip pattern: {exc}")
+        self.update(names or [])
+
+    def update(self, names):
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """add a name, and count the names that end with each of its suffixes
+        """
+        if name in self.names:
+            return
+        self.names.add(name)
+        parts = name.split(".")
+        for start in range(len(parts)):
+            suffix = ".".join(parts[start:])
+            self.suffixes[suffix] = self.suffixes.get(suffix, 0) + 1
+
+    def __contains__(self, name):
+        if name in self.names or self.suffixes.get(name) == 1:
+            return True
+        parts = name.split(".")
+        for start in range(1, len(parts)):
+            if ".".join(parts[start:]) in self.names:
+                return True
+        return bool(self.skip and self.skip.search(name))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "[test-names|%s]" % len(self.names)
+
+    def __str__(self):
+        return "[test-names|%s]" % len(self.names)
+
+
 def get_missing_tests(
-    testfile, include_private=False, skip_patterns=None, include_classes=True
+    testfile,
+    include_private=False,
+    skip_patterns=None,
+    include_classes=True,
+    static=True,
+    nproc=None,
 ):
     """Given a testing file, load in as a GridRunner, load the module again,
        and check if new tests need to be generated. Optionally take patterns
@@ -29,6 +94,8 @@ def get_missing_tests(
           - testfile (str) : the yaml test file
           - include_private (bool) : include "private" functions
           - skip_patterns (list) : list of test keys (patterns) to exclude
+          - static (bool) : parse source files instead of importing (True)
+          - nproc (int) : the number of workers to parse files with
     """
     if not os.path.exists(testfile):
         sys.exit(f"{testfile} does not exist.")
@@ -36,45 +103,44 @@ def get_missing_tests(
     if not re.search("[.](yml|yaml)$", testfile):
         sys.exit("Test file must have yml|yaml extension.")
 
-    skip_patterns = skip_patterns or []
     runner = GridRunner(testfile)
 
     # The config holds the filename we derive tests from, and tests
     files = []
-    existing = set()
-
+    existing = []
     for name, section in runner.config.items():
         # Get either the file path, module name, or relative path
         filename = extract_modulename(
             section.get("filename"), os.path.dirname(testfile)
         )
         files.append(filename)
-        [existing.add(x) for x in section.get("tests", {}).keys()]
+        existing.append(TestNames(section.get("tests", {}), skip_patterns))
 
     # Keep track of new sections seen
     sections = []
 
-    # Regular expression for existing takes into account different import paths
-    regex = "(%s)$" % "|".join(list(existing) + skip_patterns)
-
-    # Import each file as a module, or a module name, exit on error
-    for filename in files:
-        functions = extract_functions(
-            filename,
-            include_private=include_private,
-            quiet=True,
-            include_classes=include_classes,
-        )
-        sections += [
-            k
-            for k, v in functions.get("tests", {}).items()
-            if k not in existing and not re.search(regex, k)
-        ]
+    # Parse (or import) each file or module name, exit on error
+    extracted = extract_files(
+        files,
+        include_private=include_private,
+        quiet=True,
+        include_classes=include_classes,
+        static=static,
+        nproc=nproc,
+        cache_dir=runner.get_cache_dir(),
+    )
+    for functions, names in zip(extracted, existing):
+        sections += [k for k in functions.get("tests", {}) if k not in names]
     return sections
 
 
 def check_tests(
-    testfile, include_private=False, include_classes=True, skip_patterns=None
+    testfile,
+    include_private=False,
+    include_classes=True,
+    skip_patterns=None,
+    static=True,
+    nproc=None,
 ):
     """A wrapper to get_missing_tests, but we return 0 if no new tests are
        to be added, and 1 otherwise.
@@ -84,9 +150,11 @@ def check_tests(
           - include_private (bool) : include "private" functions
           - include_classes (bool) : include classes
           - skip_patterns (list) : list of test keys (patterns) to exclude
+          - static (bool) : parse source files instead of importing (True)
+          - nproc (int) : the number of workers to parse files with
     """
     sections = get_missing_tests(
-        testfile, include_private, skip_patterns, include_classes
+        testfile, include_private, skip_patterns, include_classes, static, nproc
     )
 
     # If no new sections added, exit with 0
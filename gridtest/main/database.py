@@ -0,0 +1,187 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+from gridtest.defaults import GRIDTEST_ROW_GROUP
+from gridtest.main.results import parse_metric
+from gridtest.serialize import get_serializer
+from gridtest import __version__
+import sqlite3
+import time
+import os
+
+# Each run adds a row to runs, and tests, args, and metrics reference it.
+# The uid of a test is its stable id, to join the same test across runs.
+# Args and metrics keep a text value, and a number if the value is numeric.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    input_file TEXT,
+    version TEXT,
+    started REAL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    uid TEXT,
+    function TEXT,
+    module TEXT,
+    filename TEXT,
+    success INTEGER,
+    raises TEXT
+);
+CREATE TABLE IF NOT EXISTS args (
+    test_id INTEGER NOT NULL REFERENCES tests(id),
+    name TEXT NOT NULL,
+    value TEXT,
+    number REAL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    test_id INTEGER NOT NULL REFERENCES tests(id),
+    name TEXT NOT NULL,
+    value TEXT,
+    number REAL
+);
+CREATE INDEX IF NOT EXISTS tests_function_run ON tests(function, run_id);
+CREATE INDEX IF NOT EXISTS tests_name_run ON tests(name, run_id);
+CREATE INDEX IF NOT EXISTS tests_uid_run ON tests(uid, run_id);
+CREATE INDEX IF NOT EXISTS args_test_name ON args(test_id, name);
+CREATE INDEX IF NOT EXISTS args_name_number ON args(name, number);
+CREATE INDEX IF NOT EXISTS metrics_test_name ON metrics(test_id, name);
+CREATE INDEX IF NOT EXISTS metrics_name ON metrics(name);
+"""
+
+
+class ResultsDatabase:
+    def __init__(self, filename, name=None, input_file=None, batch_size=None):
+        """A results database stores runs in sqlite, with normalized and
+           indexed tables for tests, args, and metrics so that history across
+           runs can be queried without loading json. Like a ResultsStream,
+           tests are written as they finish, and inserts are batched and
+           committed in transactions of batch_size tests.
+
+           Arguments:
+            - filename (str) : the .sqlite or .db file to write to
+            - name (str) : the name of the run (defaults to the input file)
+            - input_file (str) : the gridtest file that is being run
+            - batch_size (int) : the number of tests to commit at once
+        """
+        self.filename = os.path.abspath(filename)
+        self.name = name
+        self.input_file = input_file
+        self.batch_size = batch_size or GRIDTEST_ROW_GROUP
+        self.serializer = get_serializer()
+        self.conn = None
+        self.count = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """open (and if needed create) the database, and add a new run.
+        """
+        self.conn = sqlite3.connect(self.filename)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        cursor = self.conn.execute(
+            "INSERT INTO runs (name, input_file, version, started) VALUES (?, ?, ?, ?)",
+            (self.name, self.input_file, __version__, time.time()),
+        )
+        self.run_id = cursor.lastrowid
+        self.conn.commit()
+        self.batch = []
+
+    def write(self, name, test):
+        """add a finished test to the current batch, and write the batch if
+           it's full. Tests that ask not to be saved are skipped.
+
+           Arguments:
+            - name (str) : the key of the test in the tests lookup
+            - test (gridtest.main.test.GridTest) : the finished test
+        """
+        if test.params.get("save", True) == False:
+            return
+        self.batch.append((name, test))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """write the current batch of tests in a single transaction.
+        """
+        if not self.batch:
+            return
+
+        with self.conn:
+            args = []
+            metrics = []
+            for name, test in self.batch:
+                cursor = self.conn.execute(
+                    "INSERT INTO tests (run_id, name, uid, function, module, "
+                    "filename, success, raises) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        self.run_id,
+                        name,
+                        test.id,
+                        test.name,
+                        test.module,
+                        test.filename,
+                        int(bool(test.success)),
+                        test.raises,
+                    ),
+                )
+                test_id = cursor.lastrowid
+                for arg, value in test.params.get("args", {}).items():
+                    args.append((test_id, arg) + self.get_value(value))
+                for metric, values in test.metrics.items():
+                    metrics.append(
+                        (test_id, metric) + self.get_value(parse_metric(values))
+                    )
+
+            self.conn.executemany("INSERT INTO args VALUES (?, ?, ?, ?)", args)
+            self.conn.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?)", metrics)
+
+        self.count += len(self.batch)
+        self.batch = []
+
+    def get_value(self, value):
+        """return a (text, number) pair for a value, where number is only
+           defined for numeric values so they can be aggregated in queries.
+        """
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return (str(value), value)
+        if isinstance(value, str) or value is None:
+            return (value, None)
+        return (self.serializer.dumps(value), None)
+
+    def close(self):
+        """write any remaining tests and record the end time of the run.
+        """
+        if self.conn:
+            self.flush()
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE runs SET finished = ? WHERE id = ?",
+                    (time.time(), self.run_id),
+                )
+            self.conn.close()
+            self.conn = None
+
+    def __repr__(self):
+        return "[results-database|%s]" % self.filename
+
+    def __str__(self):
+        return "[results-database|%s]" % self.filename
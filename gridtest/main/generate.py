@@ -8,17 +8,18 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 """
 
+from gridtest.defaults import GRIDTEST_CACHE_DIR, GRIDTEST_NPROC
+from gridtest.main.cache import read_extracted, write_extracted
 from gridtest.utils import recursive_find, write_yaml
+from gridtest.logger import bot
+from collections import deque
 import importlib
+import ast
 import inspect
 import os
-import logging
 import re
 import sys
 import types
-import yaml
-
-logger = logging.getLogger(__name__)
 
 
 def get_function_typing(func):
@@ -51,7 +52,14 @@ def import_module(name):
 
 
 def generate_tests(
-    module, output=None, include_private=False, force=False, include_classes=True
+    module,
+    output=None,
+    include_private=False,
+    force=False,
+    include_classes=True,
+    static=True,
+    nproc=None,
+    cache_dir=None,
 ):
     """Generate a test output file for some input module. If an output file 
        is specified and already has existing content, in the case that check is 
@@ -75,6 +83,9 @@ def generate_tests(
           - include_private (bool) : include "private" functions
           - force (bool) : force overwrite existing functions (default False)
           - include_classes (bool) : extract classes to write tests too
+          - static (bool) : parse source files instead of importing (True)
+          - nproc (int) : the number of workers to extract files with
+          - cache_dir (str) : the cache directory for parsed files
     """
     if output and not re.search("[.](yml|yaml)$", output):
         sys.exit("Output file must have yml|yaml extension.")
@@ -87,7 +98,7 @@ def generate_tests(
 
     # Case 2: Recursively add python files
     elif os.path.isdir(module):
-        files += list(recursive_find(module))
+        files += sorted(recursive_find(module))
 
     # Case 3: assume it's a module name
     else:
@@ -102,18 +113,32 @@ def generate_tests(
             f"{output} exists! use --force to overwrite, or gridtest update instead."
         )
 
-    # Import each file as a module, or a module name, exit on error
-    for filename in files:
-        name = re.sub("[.]py$", "", filename.replace("/", "."))
-        spec[name] = extract_functions(
-            filename, include_private=include_private, include_classes=include_classes
+    # The cache of parsed files is kept alongside the output file
+    if output and not cache_dir:
+        cache_dir = GRIDTEST_CACHE_DIR or os.path.join(
+            os.path.dirname(os.path.abspath(output)), ".gridtest_cache"
         )
 
+    # Parse (or import) each file or module name, exit on error
+    functions = extract_files(
+        files,
+        include_private=include_private,
+        include_classes=include_classes,
+        static=static,
+        nproc=nproc,
+        cache_dir=cache_dir,
+    )
+    for filename, extracted in zip(files, functions):
+        name = re.sub("[.]py$", "", filename.replace("/", "."))
+        spec[name] = extracted
+
     # Write to output file
     if output:
         write_yaml(spec, output)
     else:
-        print("\n" + yaml.dump(spec))
+        import yaml
+
+        print("\n" + yaml.dump(spec, Dumper=getattr(yaml, "CDumper", yaml.Dumper)))
     return spec
 
 
@@ -150,9 +175,298 @@ def extract_modulename(filename, input_dir=None):
 
 
 def extract_functions(
-    filename, include_private=False, quiet=False, include_classes=True,
+    filename, include_private=False, quiet=False, include_classes=True, static=True
 ):
     """Given a filename, extract a module and associated functions with it
+       into a grid test. By default, a python file is parsed (and not imported)
+       to find functions, classes, and methods, and import is used for module
+       names or source that can't be parsed.
+
+       Arguments:
+          - filename (str) : a filename or module name to parse
+          - include_private (bool) : include "private" functions
+          - quiet (bool) : suppress additional output
+          - include_classes (bool) : extract classes
+          - static (bool) : parse python files instead of importing (True)
+    """
+    if static and os.path.isfile(filename):
+        functions = parse_worker((filename, include_private, quiet, include_classes))
+        if functions is not None:
+            return functions
+
+    return import_functions(
+        filename,
+        include_private=include_private,
+        quiet=quiet,
+        include_classes=include_classes,
+    )
+
+
+def extract_files(
+    files,
+    include_private=False,
+    quiet=False,
+    include_classes=True,
+    static=True,
+    nproc=None,
+    cache_dir=None,
+):
+    """Given a list of files (or module names) extract functions for each,
+       and return the results in the same order. Python files are parsed by a
+       pool of workers when there is more than one to do, and modules are
+       imported here (as import_functions results aren't always picklable).
+       If a cache directory is provided, functions parsed from a file are kept
+       there, and used again while the file has the same modified time and size.
+
+       Arguments:
+          - files (list) : filenames or module names to parse
+          - include_private (bool) : include "private" functions
+          - quiet (bool) : suppress additional output
+          - include_classes (bool) : extract classes
+          - static (bool) : parse python files instead of importing (True)
+          - nproc (int) : the number of workers (defaults to number of cores)
+          - cache_dir (str) : a cache directory for parsed files (optional)
+    """
+    nproc = nproc or GRIDTEST_NPROC
+    extracted = read_extracted(cache_dir) if cache_dir and static else {}
+
+    # Module names depend on the present working directory, and on options
+    keys = {}
+    results = {}
+    for filename in files:
+        if not static or not os.path.isfile(filename):
+            continue
+        stat = os.stat(filename)
+        key = (os.path.abspath(filename), os.getcwd(), include_private, include_classes)
+        keys[filename] = (key, (stat.st_mtime_ns, stat.st_size))
+        entry = extracted.get(key)
+        if entry and entry["mtime"] == keys[filename][1]:
+            results[filename] = entry["functions"]
+
+    todo = [x for x in keys if x not in results]
+    tasks = [(x, include_private, quiet, include_classes) for x in todo]
+    if cache_dir and static:
+        bot.debug(f"Parsing {len(todo)} files, {len(results)} found in cache.")
+
+    if nproc > 1 and len(tasks) > 1:
+        from gridtest.main.workers import init_worker
+        import multiprocessing
+
+        nproc = min(nproc, len(tasks))
+        with multiprocessing.Pool(nproc, init_worker) as pool:
+            chunksize = max(1, len(tasks) // (nproc * 4))
+            parsed = pool.map(parse_worker, tasks, chunksize=chunksize)
+    else:
+        parsed = [parse_worker(task) for task in tasks]
+
+    for filename, functions in zip(todo, parsed):
+        if functions is None:
+            continue
+        results[filename] = functions
+        key, mtime = keys[filename]
+        extracted[key] = {"mtime": mtime, "functions": functions}
+
+    if cache_dir and todo:
+        write_extracted(cache_dir, extracted)
+
+    # Module names, and files that can't be parsed, are imported
+    for filename in files:
+        if filename not in results:
+            results[filename] = import_functions(
+                filename,
+                include_private=include_private,
+                quiet=quiet,
+                include_classes=include_classes,
+            )
+    return [results[filename] for filename in files]
+
+
+def parse_worker(task):
+    """parse functions from one python file (e.g., in a worker for
+       extract_files) and return them, or None if the file can't be parsed.
+    """
+    filename, include_private, quiet, include_classes = task
+    try:
+        return parse_functions(
+            filename,
+            include_private=include_private,
+            quiet=quiet,
+            include_classes=include_classes,
+        )
+    except (SyntaxError, UnicodeDecodeError, ValueError) as exc:
+        bot.debug(f"Cannot parse {filename}, importing instead: {exc}")
+
+
+def parse_functions(
+    filename, include_private=False, quiet=False, include_classes=True,
+):
+    """Given a python file, parse the source to find functions, classes (and
+       their methods) with arguments and defaults, without importing it. The
+       result is the same structure as import_functions. A class is skipped if
+       its constructor can't be found in the file (e.g., it's inherited from
+       a class that is imported) as import_functions can't inspect those.
+
+       Arguments:
+          - filename (str) : the python file to parse
+          - include_private (bool) : include "private" functions
+          - quiet (bool) : suppress additional output
+          - include_classes (bool) : extract classes
+    """
+    with open(filename, "rb") as fd:
+        tree = ast.parse(fd.read(), filename=filename)
+
+    # The name is the one the module would be imported with
+    name = filename
+    if os.path.isabs(filename):
+        name = os.path.relpath(filename)
+    name = re.sub("[.]py$", "", name).replace("/", ".")
+
+    classes = {
+        funcname: node
+        for funcname, node in iter_definitions(tree.body)
+        if isinstance(node, ast.ClassDef)
+    }
+
+    tests = {}
+    definitions = deque(
+        (funcname, node, name) for funcname, node in iter_definitions(tree.body)
+    )
+    while definitions:
+        funcname, node, parent = definitions.popleft()
+
+        if funcname.startswith("__"):
+            continue
+        if funcname.startswith("_") and not include_private:
+            continue
+
+        if isinstance(node, ast.ClassDef):
+            if not include_classes:
+                continue
+            args = get_class_args(node, classes)
+            if args is None:
+                continue
+
+            # Methods are named by the class, as with import_functions
+            definitions += [
+                (member, child, funcname)
+                for member, child in iter_definitions(node.body)
+            ]
+
+        elif is_property(node):
+            continue
+        else:
+            args = get_args(node.args)
+
+        if not quiet:
+            bot.debug(f"Extracting {funcname} from {name}")
+        tests["%s.%s" % (parent, funcname)] = [{"args": args}]
+
+    return {"filename": os.path.abspath(filename), "tests": tests}
+
+
+def iter_definitions(body):
+    """Given the body of a module or class, yield tuples of (name, node) for
+       each function, class, or lambda assigned to a name. Definitions in
+       if, try, and with blocks (e.g., depending on a version) are included.
+    """
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node.name, node
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Lambda):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    yield target.id, node.value
+        elif isinstance(node, (ast.If, ast.Try, ast.With)):
+            blocks = [getattr(node, key, []) for key in ["body", "orelse", "finalbody"]]
+            blocks += [handler.body for handler in getattr(node, "handlers", [])]
+            for block in blocks:
+                yield from iter_definitions(block)
+
+
+def get_default(node):
+    """return the value of a default argument if it's a literal, or None
+    """
+    try:
+        return ast.literal_eval(node)
+    except Exception:
+        return None
+
+
+def get_args(arguments, skip_self=False):
+    """Given the arguments of a function node, return a lookup of names and
+       defaults (None if not defined). Keyword only arguments and *args and
+       **kwargs are not included, as with inspect.getfullargspec args.
+    """
+    names = [arg.arg for arg in getattr(arguments, "posonlyargs", []) + arguments.args]
+    defaults = [get_default(default) for default in arguments.defaults]
+    defaults = [None] * (len(names) - len(defaults)) + defaults
+    args = {}
+    for arg, default in zip(names, defaults):
+        if skip_self and not args and arg == "self":
+            continue
+        args.update(formulate_arg(arg, default))
+    return args
+
+
+def get_class_args(node, classes, seen=None):
+    """Given a class node, return the arguments of its constructor, from its
+       own __init__ or one of a base class in the same file. Return None if
+       the constructor comes from a class that isn't in the file.
+
+       Arguments:
+          - node (ast.ClassDef) : the class to get arguments for
+          - classes (dict) : a lookup of classes in the file, by name
+    """
+    seen = (seen or set()) | set([node.name])
+    for member, child in iter_definitions(node.body):
+        if member == "__init__" and not isinstance(child, ast.ClassDef):
+            return get_args(child.args, skip_self=True)
+
+    # A dataclass constructor has the annotated fields
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Call):
+            decorator = decorator.func
+        if getattr(decorator, "id", getattr(decorator, "attr", None)) == "dataclass":
+            return {
+                child.target.id: get_default(child.value) if child.value else None
+                for child in node.body
+                if isinstance(child, ast.AnnAssign)
+                and isinstance(child.target, ast.Name)
+            }
+
+    for base in node.bases:
+        if isinstance(base, ast.Name) and base.id == "object":
+            continue
+        if isinstance(base, ast.Name) and base.id in classes and base.id not in seen:
+            return get_class_args(classes[base.id], classes, seen)
+        return None
+    return {}
+
+
+def is_property(node):
+    """determine if a function node is a property (or setter, etc.) and not
+       a function that can be called.
+    """
+    for decorator in getattr(node, "decorator_list", []):
+        if isinstance(decorator, ast.Name) and decorator.id in [
+            "property",
+            "cached_property",
+        ]:
+            return True
+        if isinstance(decorator, ast.Attribute) and decorator.attr in [
+            "setter",
+            "getter",
+            "deleter",
+            "cached_property",
+        ]:
+            return True
+    return False
+
+
+def import_functions(
+    filename, include_private=False, quiet=False, include_classes=True,
+):
+    """Given a filename, import a module and extract associated functions with it
        into a grid test. This means creating a structure with function
        names and (if provided) default inputs. The user will fill in
        the rest of the file. The function can be used easily recursively by calling
@@ -179,7 +493,7 @@ def extract_functions(
         module = import_module(name)
 
     # Generate tuples with (name, module, fullname)
-    functions = [(name, module, name)]
+    functions = deque([(name, module, name)])
     meta["filename"] = inspect.getfile(module)
     module_dir = os.path.dirname(meta["filename"])
 
@@ -187,7 +501,7 @@ def extract_functions(
     seen = set()
 
     while functions:
-        funcname, func, fullname = functions.pop(0)
+        funcname, func, fullname = functions.popleft()
 
         if funcname.startswith("_") and not include_private:
             continue
@@ -220,7 +534,7 @@ def extract_functions(
             args = inspect.getfullargspec(func)
 
             if not quiet:
-                logger.info(f"Extracting {funcname} from {name}")
+                bot.debug(f"Extracting {funcname} from {name}")
                 if funcname.startswith("_"):
                     print(f"Extracting {funcname} from {name}")
 
@@ -233,11 +547,10 @@ def extract_functions(
                 if defaults and defaults[0] != "self":
                     args.args.pop(0)
 
-            for idx in range(len(args.args)):
-                default = None
-                if len(defaults) > idx:
-                    default = defaults[idx]
-                argdict.update(formulate_arg(args.args[idx], default))
+            # Defaults are for the last arguments
+            defaults = [None] * (len(args.args) - len(defaults)) + list(defaults)
+            for arg, default in zip(args.args, defaults):
+                argdict.update(formulate_arg(arg, default))
             tests[fullname].append({"args": argdict})
 
         # Exceptions will throw type errors
@@ -9,44 +9,151 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 from gridtest.main.generate import import_module, get_function_typing
+from gridtest.decorators import start_metrics, finish_metrics
 from gridtest.main.grids import intersect_args
-from io import StringIO
+from gridtest.defaults import GRIDTEST_OUTPUT_SIZE
+import hashlib
+import tempfile
+import pickle
+import io
 import re
 import sys
 import os
 
+# Spill files for output that is over the limit, opened once per worker
+SPILLS = {}
+
+
+class BoundedOutput(io.TextIOBase):
+    def __init__(self, max_size=None, spill=None):
+        """A bounded output stands in for stdout or stderr while a test runs.
+           It keeps the first and last max_size / 2 characters written, and
+           counts the rest. With spill (out or err), once the output goes
+           over max_size, all of it is also written to the spill file for the
+           worker.
+
+           Arguments:
+            - max_size (int) : the most characters to keep
+            - spill (str) : the stream (out or err) to spill output for
+        """
+        self.max_size = GRIDTEST_OUTPUT_SIZE if max_size is None else max_size
+        self.half = (self.max_size + 1) // 2
+        self.spill = spill
+        self.spilled = None
+        self.offset = None
+        self.total = 0
+        self.head = []
+        self.head_size = 0
+        self.tail = []
+        self.tail_size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        size = len(text)
+        self.total += size
+
+        # Past the limit, write what we have (not yet cut) and then everything
+        if self.spill and self.total > self.max_size:
+            if self.spilled is None:
+                self.spilled = get_spill(self.spill)
+                self.offset = self.spilled.tell()
+                self.spilled.write("".join(self.head) + "".join(self.tail))
+            self.spilled.write(text)
+
+        if self.head_size < self.half:
+            head = text[: self.half - self.head_size]
+            self.head.append(head)
+            self.head_size += len(head)
+            text = text[len(head) :]
+            if not text:
+                return size
+
+        # The tail is cut back to the last half when it's twice that
+        self.tail.append(text)
+        self.tail_size += len(text)
+        if self.tail_size > 2 * self.half:
+            self.tail = ["".join(self.tail)[-self.half :]]
+            self.tail_size = self.half
+        return size
+
+    def getlines(self):
+        """return the lines kept, with a line in place of any that were cut
+           that says how many characters, and where to find them if spilled.
+        """
+        head = "".join(self.head)
+        tail = "".join(self.tail)
+        tail = tail[len(tail) - min(len(tail), self.half) :]
+        missing = self.total - len(head) - len(tail)
+        if not missing:
+            return (head + tail).splitlines()
+
+        message = "... %s characters not captured" % missing
+        if self.spilled:
+            self.spilled.flush()
+            message += ", see %s from %s" % (self.spilled.name, self.offset)
+        return head.splitlines() + [message + " ..."] + tail.splitlines()
+
+
+def get_spill(stream):
+    """return the spill file for this worker (process) for a stream (out or
+       err), opened to append in the temporary directory.
+    """
+    key = (os.getpid(), stream)
+    if key not in SPILLS:
+        filename = os.path.join(
+            tempfile.gettempdir(), "gridtest-%s-%s.log" % (os.getpid(), stream)
+        )
+        SPILLS[key] = open(filename, "a", encoding="utf-8", errors="replace")
+    return SPILLS[key]
+
 
 class Capturing(list):
-    """capture output from stdout and stderr into capture object"""
+    """capture output from stdout and stderr into capture object. The policy
+       is keep (a bounded amount), spill (also write all of it to a file for
+       the worker if it's over the limit), or discard.
+    """
+
+    def __init__(self, policy="keep", max_size=None):
+        self.policy = policy
+        self.max_size = max_size
 
     def __enter__(self):
         self.set_stdout()
         self.set_stderr()
         return self
 
+    def get_output(self, stream):
+        if self.policy == "discard":
+            return open(os.devnull, "w")
+        spill = stream if self.policy == "spill" else None
+        return BoundedOutput(self.max_size, spill=spill)
+
     def set_stdout(self):
         self._stdout = sys.stdout
-        sys.stdout = self._stringio_out = StringIO()
+        sys.stdout = self._output_out = self.get_output("out")
 
     def set_stderr(self):
-        from io import StringIO
-
         self._stderr = sys.stderr
-        sys.stderr = self._stringio_err = StringIO()
+        sys.stderr = self._output_err = self.get_output("err")
 
     def __exit__(self, *args):
-        self.append(
-            {
-                "out": self._stringio_out.getvalue().splitlines(),
-                "err": self._stringio_err.getvalue().splitlines(),
-            }
-        )
-        del self._stringio_out
-
         # Restore previous stdout, stderr
         sys.stdout = self._stdout
         sys.stderr = self._stderr
 
+        captured = {}
+        for stream, output in [("out", self._output_out), ("err", self._output_err)]:
+            if self.policy == "discard":
+                output.close()
+                captured[stream] = []
+            else:
+                captured[stream] = output.getlines()
+        self.append(captured)
+        del self._output_out
+        del self._output_err
+
 
 def print_interactive(**kwargs):
     """A helper function to print locals that are relevant to test_basic for 
@@ -63,6 +170,39 @@ def print_interactive(**kwargs):
     print("result = func(**args)\n")
 
 
+def digest_result(result):
+    """Given a result, return a small dictionary with a content hash and size
+       that can stand in for the result itself. The result is pickled to derive
+       the hash, and if this isn't possible we fall back to the repr.
+
+       Arguments:
+         - result (object) : the result returned by a function
+    """
+    try:
+        content = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        content = repr(result).encode("utf-8")
+    return {
+        "digest": "sha256:%s" % hashlib.sha256(content).hexdigest(),
+        "size": len(content),
+    }
+
+
+def apply_result_policy(result, policy="keep"):
+    """Given a result and a policy (one of keep, digest, or discard) return
+       what should be shipped back to the parent in place of the result.
+
+       Arguments:
+         - result (object) : the result returned by a function
+         - policy (str) : keep the result, a digest of it, or discard it
+    """
+    if policy == "discard":
+        return None
+    if policy == "digest":
+        return digest_result(result)
+    return result
+
+
 def test_basic(
     funcname,
     module,
@@ -72,13 +212,16 @@ def test_basic(
     returns=None,
     interactive=False,
     metrics=None,
+    result_policy="keep",
+    output_policy="keep",
+    profile_file=None,
 ):
     """test basic is a worker version of the task.test_basic function.
        If a function is not provided, funcname, module, and filename are
        required to retrieve it. A function can only be provided directly
        if it is pickle serializable (multiprocessing would require this).
        It works equivalently but is not attached to a class, and returns
-       a list of values for [passed, result, out, err, raises]
+       a list of values for [passed, result, out, err, raises, metrics]
 
        Arguments:
          - funcname (str) : the name of the function to import
@@ -88,6 +231,9 @@ def test_basic(
          - returns (type) : a returns type to test for
          - interactive (bool) : run in interactive mode (giving user shell)
          - metrics (list) : one or more metrics (decorators) to run.
+         - result_policy (str) : keep, digest, or discard the result
+         - output_policy (str) : keep, spill, or discard the output
+         - profile_file (str) : a file for @profile to save stats to
     """
     metrics = metrics or []
 
@@ -104,6 +250,7 @@ def test_basic(
     raises = None
     out = []
     err = []
+    recorded = {}
 
     # import the decorators here (currently only support decorators from gridtest
     for metric in metrics:
@@ -157,22 +304,26 @@ def test_basic(
 
         else:
 
-            # Run and capture output and error
+            # Run and capture output and error, and values from decorators
+            start_metrics(profile=profile_file)
             try:
-                with Capturing() as output:
+                with Capturing(output_policy) as output:
                     result = func(**args)
                 if output:
                     std = output.pop(0)
                     out += std.get("out")
                     err += std.get("err")
                 passed = True
+                result = apply_result_policy(result, result_policy)
             except Exception as e:
                 raises = type(e).__name__
                 message = str(e)
                 if message:
                     err.append(message)
+            finally:
+                recorded = finish_metrics()
 
-    return [passed, result, out, err, raises]
+    return [passed, result, out, err, raises, recorded]
 
 
 def get_function(module, funcname, args, filename):
@@ -0,0 +1,169 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+gridtest.main.profiles collects the cProfile stats saved by the @profile
+metric for each test, and merges them per function and per grid slice (each
+value of a grid argument), with a summary of the top hotspots.
+
+"""
+
+from gridtest.logger import bot
+import re
+import os
+
+
+def format_function(func):
+    """Given a function key from pstats (filename, line, name) return a short
+       name for it, e.g., script.py:10(add) or {built-in method time.sleep}
+    """
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return "%s:%s(%s)" % (os.path.basename(filename), line, name)
+
+
+def get_hotspots(stats, count=10):
+    """Given pstats.Stats, return a list of tuples (function, seconds, percent)
+       for the functions with the most time spent in them (not including the
+       functions they call), the most first.
+
+       Arguments:
+        - stats (pstats.Stats) : the stats to find hotspots in
+        - count (int) : the number of hotspots to return
+    """
+    total = stats.total_tt or 1
+    functions = sorted(stats.stats.items(), key=lambda x: x[1][2], reverse=True)
+    return [
+        (format_function(func), values[2], 100 * values[2] / total)
+        for func, values in functions[:count]
+    ]
+
+
+def get_slices(tests):
+    """Given a lookup of tests for the same function, return a lookup of grid
+       slices (arg=value) and the names of tests in each, for args that have
+       more than one (scalar) value.
+    """
+    values = {}
+    for name, test in tests.items():
+        for arg, value in test.raw_args.items():
+            if isinstance(value, (int, float, str, bool)) or value is None:
+                values.setdefault(arg, {}).setdefault(value, []).append(name)
+
+    slices = {}
+    for arg, names in values.items():
+        if len(names) < 2:
+            continue
+        for value, members in names.items():
+            slices["%s=%s" % (arg, value)] = members
+    return slices
+
+
+def merge_profiles(filenames, output):
+    """merge a list of .pstats files into one, and return the stats.
+    """
+    import pstats
+
+    stats = pstats.Stats(filenames[0])
+    for filename in filenames[1:]:
+        stats.add(filename)
+    stats.dump_stats(output)
+    return stats
+
+
+def get_filename(name):
+    """return a name that is safe to use as a filename.
+    """
+    return re.sub("[^A-Za-z0-9_.,=+-]", "_", name)[:200]
+
+
+def get_profile_file(profile_dir, name):
+    """return the file that the profile for a test (by name) is saved to.
+    """
+    return os.path.join(profile_dir, "tests", get_filename(name) + ".pstats")
+
+
+def set_profiles(profile_dir, tests):
+    """Before a run, add the @profile metric to each test, and set the file
+       that its profile is saved to (in profile_dir/tests/<name>.pstats),
+       removing a profile from an earlier run.
+
+       Arguments:
+        - profile_dir (str) : the directory to save profiles to
+        - tests (dict) : the lookup of tests to run, keyed by name
+    """
+    test_dir = os.path.join(profile_dir, "tests")
+    if not os.path.exists(test_dir):
+        os.makedirs(test_dir)
+
+    for name, test in tests.items():
+        test.add_metric("@profile", first=True)
+        test.profile_file = os.path.abspath(get_profile_file(profile_dir, name))
+        if os.path.exists(test.profile_file):
+            os.remove(test.profile_file)
+
+
+def save_profiles(profile_dir, tests, top=10):
+    """Given tests run with the @profile metric (after set_profiles), record
+       the profile for each as @profile.file, and merge them per function (in
+       <function>.pstats) and per grid slice (in <function>/<arg>=<value>.pstats).
+       The top hotspots for each function are written to hotspots.txt, and
+       printed.
+
+       Arguments:
+        - profile_dir (str) : the directory with profiles
+        - tests (dict) : the lookup of finished tests, keyed by name
+        - top (int) : the number of hotspots to show for each function
+    """
+    # Group tests with a profile by function
+    functions = {}
+    for name, test in tests.items():
+        filename = get_profile_file(profile_dir, name)
+        if not os.path.exists(filename):
+            continue
+        test.metrics["@profile.file"] = [filename]
+        functions.setdefault(test.name, {})[name] = test
+
+    if not functions:
+        bot.warning("No profiles were recorded.")
+        return
+
+    lines = []
+    print("\n{:<50} {:>12} {:>8}".format("Hotspot", "Seconds", "Percent"))
+    print("{:_<120}".format(""))
+    for function, group in functions.items():
+        files = [test.metrics["@profile.file"][0] for test in group.values()]
+        output = os.path.join(profile_dir, get_filename(function) + ".pstats")
+        stats = merge_profiles(files, output)
+        hotspots = get_hotspots(stats, top)
+
+        lines.append(
+            "%s (%s tests, %.6f seconds)" % (function, len(files), stats.total_tt)
+        )
+        lines += ["  %-60s %12.6f %7.1f%%" % hotspot for hotspot in hotspots]
+        lines.append("")
+        print(function)
+        for hotspot in hotspots[:3]:
+            print("  {:<48} {:>12.6f} {:>7.1f}%".format(*hotspot))
+
+        # A slice merges the tests for one value of a grid argument
+        slices = get_slices(group)
+        if slices:
+            slice_dir = os.path.join(profile_dir, get_filename(function))
+            if not os.path.exists(slice_dir):
+                os.makedirs(slice_dir)
+            for key, names in slices.items():
+                merge_profiles(
+                    [group[name].metrics["@profile.file"][0] for name in names],
+                    os.path.join(slice_dir, get_filename(key) + ".pstats"),
+                )
+
+    with open(os.path.join(profile_dir, "hotspots.txt"), "w") as fd:
+        fd.write("\n".join(lines))
+    bot.info(f"Profiles saved to {profile_dir}")
+    return profile_dir
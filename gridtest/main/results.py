@@ -0,0 +1,567 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+from gridtest.defaults import (
+    GRIDTEST_REPORT_PAGE,
+    GRIDTEST_ROW_GROUP,
+    GRIDTEST_SYNC_EVERY,
+    GRIDTEST_SYNC_SECONDS,
+)
+from gridtest.logger import bot
+from gridtest.main.stats import summarize
+from gridtest.serialize import get_serializer
+from gridtest.utils import write_json
+import csv
+import time
+import re
+import os
+
+# A metric value that starts with a number (e.g., 0.01 ms)
+NUMBER_REGEX = r"[-+]?([0-9]+([.][0-9]*)?|[.][0-9]+)([eE][-+]?[0-9]+)?"
+
+
+def get_result(name, test):
+    """Given the name (key) of a test and the test itself, return the
+       dictionary record that is exported for it.
+
+       Arguments:
+        - name (str) : the key of the test in the tests lookup
+        - test (gridtest.main.test.GridTest) : the test to export
+    """
+    return {
+        "name": name,
+        "id": test.id,
+        "function": test.name,
+        "filename": test.filename,
+        "out": test.out,
+        "err": test.err,
+        "result": test.result,
+        "params": test.params,
+        "raises": test.raises,
+        "success": test.success,
+        "metrics": test.metrics,
+        "module": test.module,
+    }
+
+
+class ResultsStream:
+    def __init__(self, filename, sync_every=None, sync_seconds=None, serializer=None):
+        """A results stream writes one json record per line (ndjson) as tests
+           finish, so memory stays flat and partial results survive an
+           interrupted run. Records are written through a buffered file handle
+           that is flushed and synced to disk every sync_every records or
+           sync_seconds seconds, whichever comes first.
+
+           Arguments:
+            - filename (str) : the .ndjson or .jsonl file to write to
+            - sync_every (int) : flush and fsync after this many records
+            - sync_seconds (float) : flush and fsync after this many seconds
+            - serializer (str) : the json serializer to use (defaults to auto)
+        """
+        self.filename = os.path.abspath(filename)
+        self.sync_every = sync_every or GRIDTEST_SYNC_EVERY
+        self.sync_seconds = sync_seconds or GRIDTEST_SYNC_SECONDS
+        self.serializer = get_serializer(serializer)
+        self.count = 0
+        self.fd = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """open the file for writing, truncating any previous results.
+        """
+        self.fd = open(self.filename, "wb")
+        self.unsynced = 0
+        self.last_sync = time.time()
+
+    def write(self, name, test):
+        """write a record for a finished test, unless it asks not to be saved.
+
+           Arguments:
+            - name (str) : the key of the test in the tests lookup
+            - test (gridtest.main.test.GridTest) : the finished test
+        """
+        if test.params.get("save", True) == False:
+            return
+        self.fd.write(self.serializer.dumpb(get_result(name, test)) + b"\n")
+        self.count += 1
+        self.unsynced += 1
+        if (
+            self.unsynced >= self.sync_every
+            or time.time() - self.last_sync >= self.sync_seconds
+        ):
+            self.sync()
+
+    def sync(self):
+        """flush the buffered records and ask the os to write them to disk.
+        """
+        self.fd.flush()
+        os.fsync(self.fd.fileno())
+        self.unsynced = 0
+        self.last_sync = time.time()
+
+    def close(self):
+        if self.fd and not self.fd.closed:
+            self.sync()
+            self.fd.close()
+
+    def __repr__(self):
+        return "[results-stream|%s]" % self.filename
+
+    def __str__(self):
+        return "[results-stream|%s]" % self.filename
+
+
+# Columnar Metrics
+
+
+def parse_metric(values):
+    """Given the list of values recorded for a metric, return a number if
+       there is a single value that starts with one (e.g., "0.01 ms"), and
+       otherwise a string that joins the values.
+
+       Arguments:
+        - values (list) : the list of values for a metric
+    """
+    if not values:
+        return None
+    if len(values) == 1:
+        if values[0] is None:
+            return None
+        if isinstance(values[0], (int, float)):
+            return values[0]
+        match = re.match(NUMBER_REGEX, str(values[0]))
+        if match:
+            return float(match.group(0))
+    return "|".join([str(x) for x in values])
+
+
+def format_metric(values):
+    """Given the list of values recorded for a metric, return a string to
+       show the user. Floats are shortened here, but kept as they are in
+       results and exports.
+
+       Arguments:
+        - values (list) : the list of values for a metric
+    """
+    return "|".join(["%.6g" % x if isinstance(x, float) else str(x) for x in values])
+
+
+def merge_type(current, value):
+    """Given a current column type and a new value, return the type that
+       can hold both (bool, int, float, or str).
+    """
+    if value is None:
+        return current
+    if isinstance(value, bool):
+        newtype = "bool"
+    elif isinstance(value, int):
+        newtype = "int"
+    elif isinstance(value, float):
+        newtype = "float"
+    else:
+        newtype = "str"
+
+    if current in [None, newtype]:
+        return newtype
+    if set([current, newtype]) == set(["int", "float"]):
+        return "float"
+    return "str"
+
+
+class StreamGroup:
+    def __init__(self, streams):
+        """A stream group writes finished tests to each of a list of streams
+           (or anything else with write(name, test)), skipping those that
+           are None. Opening and closing is left to the owner of each stream.
+        """
+        self.streams = [stream for stream in streams if stream]
+
+    def write(self, name, test):
+        for stream in self.streams:
+            stream.write(name, test)
+
+    def __bool__(self):
+        return bool(self.streams)
+
+
+class MetricsTable:
+    def __init__(self, tests, row_group=None):
+        """A metrics table has one row per test, with a column for each grid
+           argument, each metric, and the test status. A first pass over the
+           tests derives the columns and their types, and then rows are
+           generated in row groups so they can be written without holding
+           the entire table in memory.
+
+           Arguments:
+            - tests (dict) : the lookup of finished tests, keyed by name
+            - row_group (int) : the number of rows to write at once
+        """
+        self.tests = tests
+        self.row_group = row_group or GRIDTEST_ROW_GROUP
+        self.serializer = get_serializer()
+        self.columns = {"name": "str", "id": "str", "function": "str"}
+        self.args = {}
+        self.metrics = {}
+
+        for name, test in self.iter_tests():
+            for arg, value in test.params.get("args", {}).items():
+                if arg != "self":
+                    self.args[arg] = self.get_column(arg)
+                    self.columns[self.args[arg]] = merge_type(
+                        self.columns.get(self.args[arg]), value
+                    )
+            for metric, values in test.metrics.items():
+                self.metrics[metric] = metric
+                self.columns[metric] = merge_type(
+                    self.columns.get(metric), parse_metric(values)
+                )
+
+        self.columns["success"] = "bool"
+        self.columns["raises"] = "str"
+
+    def get_column(self, arg):
+        """argument columns are named by the argument, unless the name is
+           already used by one of the columns we always include.
+        """
+        if arg in ["name", "id", "function", "success", "raises"]:
+            return "args.%s" % arg
+        return arg
+
+    def iter_tests(self):
+        for name, test in self.tests.items():
+            if test.params.get("save", True) == False:
+                continue
+            yield name, test
+
+    def get_value(self, column, value):
+        """Convert a value to the type of the column. Values that aren't
+           scalars are written as (compact) json in string columns.
+        """
+        if value is None:
+            return None
+        if self.columns[column] == "float":
+            return float(value)
+        if self.columns[column] == "str" and not isinstance(value, str):
+            return self.serializer.dumps(value)
+        return value
+
+    def iter_rows(self):
+        """yield lists of rows (dictionaries), each list with up to row_group
+           rows.
+        """
+        rows = []
+        for name, test in self.iter_tests():
+            row = {"name": name, "id": test.id, "function": test.name}
+            for arg, value in test.params.get("args", {}).items():
+                if arg in self.args:
+                    row[self.args[arg]] = self.get_value(self.args[arg], value)
+            for metric, values in test.metrics.items():
+                row[metric] = self.get_value(metric, parse_metric(values))
+            row["success"] = test.success
+            row["raises"] = test.raises
+            rows.append(row)
+            if len(rows) >= self.row_group:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+    def iter_columns(self):
+        """yield row groups as a dictionary of columns (lists of values).
+        """
+        for rows in self.iter_rows():
+            yield {column: [row.get(column) for row in rows] for column in self.columns}
+
+    def write_csv(self, filename):
+        """write the table to a csv file, one row group at a time.
+        """
+        with open(filename, "w", newline="") as fd:
+            writer = csv.DictWriter(fd, fieldnames=list(self.columns))
+            writer.writeheader()
+            for rows in self.iter_rows():
+                writer.writerows(rows)
+        return filename
+
+    def write_parquet(self, filename):
+        """write the table to a parquet file with one parquet row group per
+           row group, with typed columns. Requires pyarrow.
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            bot.exit("pyarrow is required to save to parquet: pip install pyarrow")
+
+        types = {
+            "bool": pyarrow.bool_(),
+            "int": pyarrow.int64(),
+            "float": pyarrow.float64(),
+            "str": pyarrow.string(),
+        }
+        schema = pyarrow.schema(
+            [(column, types[kind or "str"]) for column, kind in self.columns.items()]
+        )
+        with pyarrow.parquet.ParquetWriter(filename, schema) as writer:
+            for columns in self.iter_columns():
+                writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        return filename
+
+    def write_npz(self, filename):
+        """write the table to a compressed numpy npz file, with one array per
+           column. Missing values in numeric columns are nan. Requires numpy.
+        """
+        try:
+            import numpy
+        except ImportError:
+            bot.exit("numpy is required to save to npz: pip install numpy")
+
+        columns = {column: [] for column in self.columns}
+        for group in self.iter_columns():
+            for column, values in group.items():
+                columns[column] += values
+
+        arrays = {}
+        for column, values in columns.items():
+            kind = self.columns[column]
+            if kind in ["int", "bool"] and None in values:
+                kind = "float"
+            if kind == "float":
+                values = [numpy.nan if x is None else x for x in values]
+                arrays[column] = numpy.array(values, dtype=float)
+            elif kind in ["int", "bool"]:
+                arrays[column] = numpy.array(values, dtype=kind)
+            else:
+                arrays[column] = numpy.array(
+                    ["" if x is None else x for x in values], dtype=str
+                )
+        numpy.savez_compressed(filename, **arrays)
+        return filename
+
+    def __repr__(self):
+        return "[metrics-table|%s rows]" % len(self.tests)
+
+    def __str__(self):
+        return "[metrics-table|%s rows]" % len(self.tests)
+
+
+# Grouped Metrics
+
+# The statistics for each group of a metric, in the order they are shown
+GROUP_STATISTICS = ["count", "mean", "stdev", "min", "median", "p95", "max"]
+
+
+def get_numbers(values):
+    """Given the list of values recorded for a metric, return the numbers in
+       it, parsing strings that start with one (e.g., "0.01 ms").
+    """
+    if not isinstance(values, list):
+        values = [values]
+    numbers = []
+    for value in values:
+        if isinstance(value, bool) or value is None:
+            continue
+        if isinstance(value, (int, float)):
+            numbers.append(value)
+            continue
+        match = re.match(NUMBER_REGEX, str(value))
+        if match:
+            numbers.append(float(match.group(0)))
+    return numbers
+
+
+def get_group_value(value):
+    """return a value of an argument to group by, as itself if it's a scalar,
+       and as (compact) json otherwise so it can be a key.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return get_serializer().dumps(value)
+
+
+def group_metrics(tests, by=None):
+    """Group tests by function and the values of some arguments, and summarize
+       each numeric metric in each group (count, mean, stdev, min, quartiles,
+       95th percentile and max). Values are collected in one pass over the
+       tests, one list per group and metric, so repeated tests (e.g., with a
+       count) collapse into one row. Returns a list of rows, in the order the
+       groups are first seen.
+
+       Arguments:
+        - tests (dict) : the lookup of finished tests, keyed by name
+        - by (list) : the names of arguments to group by (none for just the function)
+    """
+    by = by or []
+    groups = {}
+    for name, test in tests.items():
+        if test.params.get("save", True) == False or not test.metrics:
+            continue
+        key = tuple(get_group_value(test.raw_args.get(arg)) for arg in by)
+        group = groups.setdefault((test.name, key), {})
+        for metric, values in test.metrics.items():
+            group.setdefault(metric, []).extend(get_numbers(values))
+
+    rows = []
+    for (function, key), metrics in groups.items():
+        for metric, values in metrics.items():
+            if values:
+                row = {"function": function, "args": dict(zip(by, key))}
+                row["metric"] = metric
+                row.update(summarize(values))
+                rows.append(row)
+    return rows
+
+
+def print_groups(rows, by=None):
+    """print grouped metrics from group_metrics as a table for each metric,
+       with a row for each function and values of the arguments grouped by.
+    """
+    by = by or []
+    metrics = {}
+    for row in rows:
+        metrics.setdefault(row["metric"], []).append(row)
+
+    for metric, group in metrics.items():
+        header = ["{:<30}".format("Function")]
+        header += ["{:>12}".format(arg[:12]) for arg in by]
+        header += ["{:>12}".format(key) for key in GROUP_STATISTICS]
+        print("\n" + metric)
+        print(" ".join(header))
+        print("_" * min(len(" ".join(header)), 120))
+        for row in group:
+            line = ["{:<30}".format(row["function"])]
+            line += ["{:>12}".format(str(row["args"][arg])[:12]) for arg in by]
+            line += [
+                "{:>12}".format(
+                    "%.6g" % row[key] if isinstance(row[key], float) else row[key]
+                )
+                for key in GROUP_STATISTICS
+            ]
+            print(" ".join(line))
+
+
+# Web Report
+
+
+def get_report_record(name, test):
+    """Given the name (key) of a test and the test itself, return the smaller
+       record used in a report data page. The result is truncated to a string
+       slug, as the full result is only available from a results export.
+    """
+    result = str(test.result)
+    if len(result) > 80:
+        result = result[:79]
+    return {
+        "name": name,
+        "id": test.id,
+        "module": test.module,
+        "success": test.success,
+        "raises": test.raises,
+        "args": test.params.get("args", {}),
+        "result": result,
+        "out": test.out,
+        "err": test.err,
+        "metrics": test.metrics,
+    }
+
+
+def write_report_data(report_dir, tests, page_size=None, group_by=None):
+    """Write the data for a web report: a summary.json with counts per function
+       and status and aggregates for numeric metrics, and pages of tests for
+       each function under data/ so the report can load them on demand.
+
+       Arguments:
+        - report_dir (str) : the report directory to write data to
+        - tests (dict) : the lookup of finished tests, keyed by name
+        - page_size (int) : the number of tests per data page
+        - group_by (list) : if not None, add metrics grouped by these arguments
+    """
+    page_size = page_size or GRIDTEST_REPORT_PAGE
+    os.makedirs(os.path.join(report_dir, "data"), exist_ok=True)
+    summary = {"total": 0, "success": 0, "failure": 0, "page_size": page_size}
+
+    # First pass: group test names by function, only keeping names
+    functions = {}
+    for name, test in tests.items():
+        if test.params.get("save", True) == False:
+            continue
+        functions.setdefault(test.name, []).append(name)
+
+    # Metrics grouped by arguments are added to each function
+    groups = {}
+    if group_by is not None:
+        for row in group_metrics(tests, group_by):
+            groups.setdefault(row["function"], []).append(row)
+
+    summary["functions"] = []
+    for idx, (function, names) in enumerate(functions.items()):
+        entry = {
+            "name": function,
+            "index": idx,
+            "total": len(names),
+            "success": 0,
+            "failure": 0,
+            "raises": {},
+            "metrics": {},
+            "pages": [],
+        }
+        if group_by is not None:
+            entry["groups"] = groups.get(function, [])
+
+        for page, start in enumerate(range(0, len(names), page_size)):
+            records = []
+            for name in names[start : start + page_size]:
+                test = tests[name]
+                records.append(get_report_record(name, test))
+                if test.success:
+                    entry["success"] += 1
+                else:
+                    entry["failure"] += 1
+                if test.raises:
+                    entry["raises"].setdefault(test.raises, 0)
+                    entry["raises"][test.raises] += 1
+                for metric, values in test.metrics.items():
+                    add_aggregate(entry["metrics"], metric, parse_metric(values))
+
+            pagefile = os.path.join("data", "%s-%s.json" % (idx, page))
+            write_json(records, os.path.join(report_dir, pagefile), pretty=False)
+            entry["pages"].append(pagefile)
+
+        for metric, aggregate in entry["metrics"].items():
+            if aggregate["count"]:
+                aggregate["mean"] = aggregate.pop("sum") / aggregate["count"]
+
+        summary["total"] += entry["total"]
+        summary["success"] += entry["success"]
+        summary["failure"] += entry["failure"]
+        summary["functions"].append(entry)
+
+    write_json(summary, os.path.join(report_dir, "summary.json"), pretty=False)
+    return summary
+
+
+def add_aggregate(aggregates, metric, value):
+    """Add a value to a running count, min, max, and sum for a metric. Values
+       that aren't numeric are not aggregated.
+    """
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return
+    if metric not in aggregates:
+        aggregates[metric] = {"count": 0, "min": value, "max": value, "sum": 0}
+    aggregate = aggregates[metric]
+    aggregate["count"] += 1
+    aggregate["sum"] += value
+    aggregate["min"] = min(aggregate["min"], value)
+    aggregate["max"] = max(aggregate["max"], value)
@@ -0,0 +1,162 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+gridtest.main.scaling fits how a metric (e.g., a time) grows with a numeric
+grid argument (a size), for each function and set of the other arguments,
+to find the complexity (constant, log n, n, n log n, n^2, or a power law).
+
+"""
+
+from gridtest.main.stats import fit_scaling, SCALING_MODELS
+from gridtest.main.results import get_numbers
+from gridtest.logger import bot
+import numbers
+
+
+# The exponent of the power of n for each model, to compare a power law fit
+EXPONENTS = {"constant": 0, "log n": 0, "n": 1, "n log n": 1, "n^2": 2}
+
+# A power law can be this much above the exponent of a limit, for log factors
+EXPONENT_SLACK = 0.1
+
+
+def find_metric(tests):
+    """return the metric to fit if one isn't given: the median time from
+       @benchmark, or else @timeit, whichever the tests recorded.
+    """
+    for metric in ["@benchmark.median", "@timeit"]:
+        if any(metric in test.metrics for test in tests.values()):
+            return metric
+
+
+def get_scaling(tests, arg, metric=None, min_sizes=3):
+    """Given finished tests, group them by function and the values of the other
+       args, and fit how the metric grows with the (numeric) arg in each group.
+       Returns a list of results (function, group, metric, sizes, points, and
+       the fits with the best first). Groups with fewer than min_sizes
+       different sizes are skipped.
+
+       Arguments:
+        - tests (dict) : the lookup of finished tests, keyed by name
+        - arg (str) : the name of the numeric grid argument (the size)
+        - metric (str) : the metric to fit (defaults to @benchmark.median or @timeit)
+        - min_sizes (int) : the fewest different sizes to fit a group
+    """
+    metric = metric or find_metric(tests)
+    if not metric:
+        bot.warning("Tests have no @benchmark or @timeit metric to fit, add one.")
+        return []
+
+    groups = {}
+    for name, test in tests.items():
+        size = test.raw_args.get(arg)
+        if (
+            not test.success
+            or isinstance(size, bool)
+            or not isinstance(size, numbers.Number)
+            or size <= 0
+        ):
+            continue
+        others = tuple(
+            sorted(
+                (key, repr(value)) for key, value in test.raw_args.items() if key != arg
+            )
+        )
+        points = groups.setdefault((test.name, others), [])
+        values = get_numbers(test.metrics.get(metric, []))
+        points += [(size, value) for value in values]
+
+    results = []
+    for (function, others), points in groups.items():
+        sizes = sorted(set(size for size, _ in points))
+        if len(sizes) < min_sizes:
+            continue
+        results.append(
+            {
+                "function": function,
+                "group": dict(others),
+                "metric": metric,
+                "sizes": sizes,
+                "points": len(points),
+                "fits": fit_scaling([x[0] for x in points], [x[1] for x in points]),
+            }
+        )
+
+    if not results:
+        bot.warning(
+            f"No tests have {metric} for at least {min_sizes} sizes of {arg} to fit."
+        )
+    return results
+
+
+def exceeds(fit, limit):
+    """return True if a fit grows faster than a limit model (e.g., n log n).
+       A model that doesn't grow (b <= 0) never exceeds the limit, and a power
+       law exceeds it if the exponent is more than the limit's (with slack for
+       log factors).
+    """
+    if fit["b"] <= 0 or fit["model"] == "constant":
+        return False
+    if fit["model"] == "n^b":
+        return fit["b"] > EXPONENTS[limit] + EXPONENT_SLACK
+    models = list(SCALING_MODELS)
+    return models.index(fit["model"]) > models.index(limit)
+
+
+def format_fit(fit):
+    """return a fit as an equation, e.g., y = 0.001 + 2e-06 * n log n
+    """
+    if fit["model"] == "constant":
+        return "y = %.4g" % fit["a"]
+    if fit["model"] == "n^b":
+        return "y = %.4g * n^%.3f" % (fit["a"], fit["b"])
+    return "y = %.4g + %.4g * %s" % (fit["a"], fit["b"], fit["model"])
+
+
+def print_scaling(results, arg, limit=None):
+    """print the best fit for each group of scaling results, and return 1 if
+       a limit model is given and any best fit grows faster, 0 otherwise.
+
+       Arguments:
+        - results (list) : the results from get_scaling
+        - arg (str) : the name of the size argument, for the header
+        - limit (str) : the model to not exceed, one of SCALING_MODELS
+    """
+    if limit and limit not in SCALING_MODELS:
+        bot.exit(f"{limit} is not a model, choose from {', '.join(SCALING_MODELS)}")
+    if not results:
+        return 0
+
+    print(
+        "\n{:<30} {:<30} {:>6}  {:<10} {:<40}".format(
+            "Function", "Group", "Points", "Model", "Fit (n = %s)" % arg
+        )
+    )
+    print("{:_<120}".format(""))
+
+    return_code = 0
+    for result in results:
+        best = result["fits"][0]
+        group = ",".join("%s=%s" % item for item in result["group"].items())
+        line = "{:<30} {:<30} {:>6}  {:<10} {:<40}".format(
+            result["function"],
+            group or "-",
+            result["points"],
+            best["model"],
+            format_fit(best),
+        )
+        if limit and exceeds(best, limit):
+            bot.failure(line)
+            return_code = 1
+        else:
+            print(line)
+
+    print("\n%s fit for %s groups" % (results[0]["metric"], len(results)))
+    if return_code:
+        bot.failure(f"Some functions grow faster than {limit} with {arg}.")
+    return return_code
@@ -0,0 +1,254 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+gridtest.main.server provides a server that keeps a warm pool of workers
+(with heavy modules already imported) and runs tests submitted over a unix
+socket, and the client function to submit a run and stream back results.
+Each message is a line of json.
+
+"""
+
+from gridtest.defaults import GRIDTEST_SOCKET, GRIDTEST_WORKERS
+from gridtest.logger import bot
+import importlib
+import socket
+import json
+import os
+
+
+class SocketStream:
+    def __init__(self, fd):
+        """A socket stream writes a short record for each finished test to a
+           client, in the same way a ResultsStream writes to a file. If the
+           client goes away, the run continues and records are dropped.
+
+           Arguments:
+            - fd (file) : the binary file for the client connection
+        """
+        self.fd = fd
+        self.connected = True
+
+    def send(self, record):
+        if not self.connected:
+            return
+        try:
+            self.fd.write(json.dumps(record).encode("utf-8") + b"\n")
+            self.fd.flush()
+        except OSError:
+            self.connected = False
+
+    def write(self, name, test):
+        self.send(
+            {
+                "event": "result",
+                "name": name,
+                "success": test.success,
+                "summary": test.summary,
+            }
+        )
+
+
+class GridServer:
+    def __init__(self, socket_path=None, nproc=None, preload=None):
+        """A grid server keeps a pool of workers between runs, forked after
+           importing the preload modules so each worker already has them.
+           Runs are handled one at a time. Workers import the modules being
+           tested on demand, so if a source file for a run has changed since
+           the pool started, the pool is started again.
+
+           Arguments:
+            - socket_path (str) : the unix socket to listen on
+            - nproc (int) : the number of workers in the pool
+            - preload (list) : names of modules to import before forking
+        """
+        self.socket_path = os.path.abspath(socket_path or GRIDTEST_SOCKET)
+        self.nproc = nproc or GRIDTEST_WORKERS
+        self.preload = preload or []
+        self.socket = None
+        self.pool = None
+        self.mtimes = {}
+
+    def open(self):
+        """import the preload modules and start listening on the socket. Exit
+           if another server is already listening there.
+        """
+        for name in self.preload:
+            bot.info(f"Preloading {name}")
+            importlib.import_module(name)
+
+        if os.path.exists(self.socket_path):
+            try:
+                submit_socket(self.socket_path).close()
+                bot.exit(f"A gridtest server is already running at {self.socket_path}")
+            except OSError:
+                os.remove(self.socket_path)
+
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.bind(self.socket_path)
+        self.socket.listen()
+        bot.info(f"Listening on {self.socket_path}")
+
+    def serve(self, count=None):
+        """handle runs from clients, forever or for count runs.
+        """
+        handled = 0
+        while count is None or handled < count:
+            conn, _ = self.socket.accept()
+            with conn:
+                self.handle(conn)
+            handled += 1
+
+    def close(self):
+        """stop the workers, and stop listening on the socket.
+        """
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def reset_pool(self):
+        """terminate the workers after a run that raised, as they may be in
+           the middle of tasks, so the next run starts a new pool.
+        """
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+
+    def get_pool(self, runner):
+        """return the pool of workers for a runner, starting it (again) if
+           it doesn't exist or a source file for the runner has changed.
+        """
+        from gridtest.main.watch import get_section_sources, get_mtime
+
+        mtimes = {path: get_mtime(path) for path in get_section_sources(runner)}
+        changed = [
+            path
+            for path, mtime in mtimes.items()
+            if path in self.mtimes and self.mtimes[path] != mtime
+        ]
+        if changed and self.pool:
+            bot.info("Sources changed, starting workers again.")
+            self.pool.terminate()
+            self.pool = None
+        self.mtimes.update(mtimes)
+
+        if not self.pool:
+            from gridtest.main.workers import init_worker
+            import multiprocessing
+
+            self.pool = multiprocessing.Pool(self.nproc, init_worker)
+        return self.pool
+
+    def handle(self, conn):
+        """handle one run: read the request, run the tests with the warm pool
+           while streaming results back, and finish with the return code.
+        """
+        fd = conn.makefile("rwb")
+        stream = SocketStream(fd)
+        try:
+            request = json.loads(fd.readline())
+            return_code = self.run(request, stream)
+        except SystemExit as exc:
+            return_code = exc.code if isinstance(exc.code, int) else 1
+            self.reset_pool()
+        except Exception as exc:
+            bot.error(f"Error running tests: {exc}")
+            stream.send({"event": "error", "message": str(exc)})
+            return_code = 1
+            self.reset_pool()
+        stream.send({"event": "done", "return_code": return_code})
+        fd.close()
+
+    def run(self, request, stream):
+        """run a request from a client, a dictionary with the input_file and
+           (optionally) keyword arguments for GridRunner.run.
+        """
+        from gridtest.main.test import GridRunner
+        from gridtest.main.watch import forget_modules
+        from gridtest.main import cache
+
+        # Sources may have changed since the last run, digest them again
+        cache.source_digests.clear()
+
+        bot.info(f"Running {request['input_file']}")
+        runner = GridRunner(request.pop("input_file"))
+        try:
+            return runner.run(
+                listener=stream, pool=self.get_pool(runner), nproc=self.nproc, **request
+            )
+
+        # Sources imported here (e.g., for grid functions) are imported again
+        finally:
+            forget_modules(self.mtimes)
+
+    def __repr__(self):
+        return "[gridtest-server|%s]" % self.socket_path
+
+    def __str__(self):
+        return "[gridtest-server|%s]" % self.socket_path
+
+
+def submit_socket(socket_path):
+    """return a socket connected to a server, raising OSError if there isn't
+       a server listening.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        raise
+    return client
+
+
+def submit(request, socket_path=None):
+    """submit a run to a gridtest server, print results as they finish, and
+       return the return code of the run.
+
+       Arguments:
+        - request (dict) : the input_file and keyword arguments for the run
+        - socket_path (str) : the unix socket that the server listens on
+    """
+    socket_path = socket_path or GRIDTEST_SOCKET
+    try:
+        client = submit_socket(socket_path)
+    except OSError:
+        bot.exit(
+            f"Cannot connect to a server at {socket_path}, start one with gridtest serve."
+        )
+
+    total = 0
+    success = 0
+    with client, client.makefile("rwb") as fd:
+        fd.write(json.dumps(request).encode("utf-8") + b"\n")
+        fd.flush()
+        for line in fd:
+            record = json.loads(line)
+            if record["event"] == "result":
+                total += 1
+                if record["success"]:
+                    success += 1
+                    bot.success(
+                        "{:<30} {:<30} {:<30}".format(
+                            record["name"], "success", record["summary"]
+                        )
+                    )
+                else:
+                    bot.failure(f"failure: {record['name']} {record['summary']}")
+            elif record["event"] == "error":
+                bot.error(record["message"])
+            elif record["event"] == "done":
+                print(f"\n{success}/{total} tests passed")
+                return record["return_code"]
+
+    bot.error("The server closed the connection before the run finished.")
+    return 1
@@ -0,0 +1,222 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+gridtest.main.stats provides summary statistics for repeated measurements
+(e.g., timings) using the standard library, so they can be calculated in a
+worker without numpy.
+
+"""
+
+import math
+
+
+def percentile(values, q):
+    """return the q-th percentile (0 to 100) of a list of numbers, with linear
+       interpolation between the closest ranks (the numpy default).
+
+       Arguments:
+        - values (list) : the numbers to get the percentile for
+        - q (float) : the percentile, between 0 and 100
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    fraction = position - lower
+    return values[lower] + (values[upper] - values[lower]) * fraction
+
+
+def describe(values):
+    """return a lookup of summary statistics for a list of numbers: the min,
+       median, mean, standard deviation (sample, 0 for one value), and the
+       95th percentile.
+
+       Arguments:
+        - values (list) : the numbers to describe
+    """
+    if not values:
+        return {}
+    mean = sum(values) / len(values)
+    stdev = 0.0
+    if len(values) > 1:
+        stdev = math.sqrt(sum((x - mean) ** 2 for x in values) / (len(values) - 1))
+    return {
+        "min": min(values),
+        "median": percentile(values, 50),
+        "mean": mean,
+        "stdev": stdev,
+        "p95": percentile(values, 95),
+    }
+
+
+def summarize(values):
+    """return the summary of a group of values (e.g., a metric for the tests
+       with the same arguments): the count, mean, standard deviation, min,
+       quartiles, 95th percentile, and max.
+
+       Arguments:
+        - values (list) : the numbers to summarize
+    """
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    summary = describe(values)
+    return {
+        "count": len(values),
+        "mean": summary["mean"],
+        "stdev": summary["stdev"],
+        "min": values[0],
+        "p25": percentile(values, 25),
+        "median": summary["median"],
+        "p75": percentile(values, 75),
+        "p95": summary["p95"],
+        "max": values[-1],
+    }
+
+
+def betainc(a, b, x):
+    """return the regularized incomplete beta function I_x(a, b), evaluated
+       with a continued fraction (modified Lentz's method).
+    """
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+
+    # The continued fraction converges quickly for x below this, else use symmetry
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - betainc(b, a, 1 - x)
+
+    front = math.exp(
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log(1 - x)
+    )
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in [
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ]:
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * result / a
+
+
+def t_sf(t, df):
+    """return the survival function (1 - cdf) of Student's t distribution,
+       the probability of a value greater than t with df degrees of freedom.
+    """
+    tail = 0.5 * betainc(df / 2, 0.5, df / (df + t * t))
+    return tail if t > 0 else 1.0 - tail
+
+
+def welch_test(before, after):
+    """Given summaries (mean, stdev, count) of two samples, return a one
+       sided p-value for Welch's t-test that the mean after is greater than
+       the mean before (e.g., that a function is slower). Summaries are
+       enough, so raw measurements don't need to be kept.
+
+       Arguments:
+        - before (tuple) : the (mean, stdev, count) of the first sample
+        - after (tuple) : the (mean, stdev, count) of the second sample
+    """
+    mean1, stdev1, count1 = before
+    mean2, stdev2, count2 = after
+    var1 = stdev1 ** 2 / count1
+    var2 = stdev2 ** 2 / count2
+    if var1 + var2 == 0 or count1 < 2 or count2 < 2:
+        return 0.0 if mean2 > mean1 else 1.0
+
+    t = (mean2 - mean1) / math.sqrt(var1 + var2)
+    df = (var1 + var2) ** 2 / (
+        var1 ** 2 / (count1 - 1) + var2 ** 2 / (count2 - 1)
+    )
+    return t_sf(t, df)
+
+
+# Models for how a measurement grows with a size n, y = a + b * f(n)
+SCALING_MODELS = {
+    "constant": None,
+    "log n": lambda n: math.log(n),
+    "n": lambda n: n,
+    "n log n": lambda n: n * math.log(n),
+    "n^2": lambda n: n * n,
+}
+
+
+def linear_fit(xs, ys):
+    """return the intercept and slope of the least squares line through
+       points (xs, ys), or None if the xs are all the same.
+    """
+    count = len(xs)
+    mean_x = sum(xs) / count
+    mean_y = sum(ys) / count
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0:
+        return None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+    return mean_y - slope * mean_x, slope
+
+
+def fit_scaling(sizes, values):
+    """Given sizes (n, positive numbers) and the measurement for each (e.g., a
+       time), fit each of the SCALING_MODELS and a power law (y = a * n^b,
+       fit to the logs) with least squares. Returns a list of fits (model,
+       a, b, rss, bic) with the best (lowest Bayesian information criterion,
+       which penalizes the extra coefficient) first.
+
+       Arguments:
+        - sizes (list) : the size for each measurement
+        - values (list) : the measurements
+    """
+    count = len(sizes)
+    scale = sum(y * y for y in values) / count or 1.0
+
+    def get_fit(model, a, b, predict, params):
+        rss = sum((y - predict(n)) ** 2 for n, y in zip(sizes, values))
+        # A floor for the error keeps exact fits comparable
+        bic = count * math.log(max(rss / count, 1e-12 * scale)) + params * math.log(
+            count
+        )
+        return {"model": model, "a": a, "b": b, "rss": rss, "bic": bic}
+
+    mean = sum(values) / count
+    fits = [get_fit("constant", mean, 0.0, lambda n: mean, 1)]
+    for model, transform in SCALING_MODELS.items():
+        if transform is None:
+            continue
+        coefficients = linear_fit([transform(n) for n in sizes], values)
+        if coefficients:
+            a, b = coefficients
+            fits.append(
+                get_fit(model, a, b, lambda n, a=a, b=b: a + b * transform(n), 2)
+            )
+
+    if all(y > 0 for y in values):
+        coefficients = linear_fit(
+            [math.log(n) for n in sizes], [math.log(y) for y in values]
+        )
+        if coefficients:
+            a, b = math.exp(coefficients[0]), coefficients[1]
+            fits.append(get_fit("n^b", a, b, lambda n: a * n ** b, 2))
+
+    return sorted(fits, key=lambda fit: fit["bic"])
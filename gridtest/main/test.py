@@ -9,11 +9,22 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 from gridtest.defaults import (
+    GRIDTEST_CACHE_DIR,
     GRIDTEST_WORKERS,
     GRIDTEST_RETURNTYPES,
+    GRIDTEST_RESULT_POLICIES,
+    GRIDTEST_CHECKS,
+    GRIDTEST_OUTPUT_POLICIES,
+    GRIDTEST_OUTPUT,
+    GRIDTEST_ID_LENGTH,
 )
 from gridtest.templates import copy_template
-from gridtest.utils import read_yaml, write_yaml, write_json, save_pickle
+from gridtest.utils import (
+    write_yaml,
+    write_json,
+    write_msgpack,
+    save_pickle,
+)
 from gridtest.logger import bot
 from gridtest import __version__
 
@@ -22,14 +33,31 @@ from gridtest.main.generate import (
     extract_modulename,
 )
 from gridtest.main.grids import Grid
-from gridtest.main.helpers import test_basic
-from gridtest.main.workers import Workers
+from gridtest.main.helpers import test_basic, digest_result
+from gridtest.main.results import (
+    ResultsStream,
+    StreamGroup,
+    MetricsTable,
+    format_metric,
+    get_result,
+    group_metrics,
+    print_groups,
+    write_report_data,
+)
+from gridtest.main.cache import (
+    ResultsCache,
+    get_test_id,
+    read_config,
+    read_failed,
+    write_failed,
+)
 from gridtest.main.substitute import substitute_func, substitute_args
 from copy import deepcopy
 
 import re
 import shutil
 import sys
+import time
 import os
 
 
@@ -63,6 +91,8 @@ class GridTest:
         self.out = []
         self.err = []
         self.metrics = {}
+        self.cache_key = None
+        self.profile_file = None
 
         # Parse input arguments
         self.set_params(params)
@@ -82,6 +112,22 @@ class GridTest:
            to clean up after the test is run.
         """
         self.params = params or {}
+        if self.result_policy not in GRIDTEST_RESULT_POLICIES:
+            bot.exit(
+                "%s: result must be one of %s"
+                % (self.name, ", ".join(GRIDTEST_RESULT_POLICIES))
+            )
+        if self.result_policy == "digest":
+            self.check_digest_params()
+        if self.output_policy not in GRIDTEST_OUTPUT_POLICIES:
+            bot.exit(
+                "%s: output must be one of %s"
+                % (self.name, ", ".join(GRIDTEST_OUTPUT_POLICIES))
+            )
+
+        # Keep args before substitution, to derive a stable id and cache key
+        self.raw_args = dict(self.params.get("args", {}))
+        self.id = get_test_id(self)
         for name, value in self.params.get("args", {}).items():
             new_value = self.substitute(value)
             self.params["args"][name] = new_value
@@ -106,6 +152,19 @@ class GridTest:
         value = self._substitute_func(value)
         return value
 
+    def check_digest_params(self):
+        """A digest of a result can only be compared to a value (returns or
+           equals), so exit if a check would need the result itself.
+        """
+        message = "%s: %s cannot be used with result: digest"
+        for key in ["istrue", "isfalse", "isinstance"]:
+            if key in self.params:
+                bot.exit(message % (self.name, key))
+        for key in GRIDTEST_CHECKS:
+            value = self.params.get(key)
+            if isinstance(value, str) and re.search(r"{{(\s+)?result(\s)?}}", value):
+                bot.exit(message % (self.name, "{{ result }}"))
+
     def post_substitute(self):
         """After a run, sometimes we want to check the result (whatever it is)
         """
@@ -151,6 +210,27 @@ class GridTest:
             return self.summary_success()
         return self.summary_failure()
 
+    @property
+    def result_policy(self):
+        """the result policy determines if the result is kept (keep), only
+           kept as a digest (digest), or not returned at all (discard).
+        """
+        return self.params.get("result", "keep")
+
+    @property
+    def output_policy(self):
+        """the output policy determines if stdout and stderr are kept up to
+           a limit (keep), also spilled to a file if over it (spill), or not
+           kept at all (discard).
+        """
+        return self.params.get("output", GRIDTEST_OUTPUT)
+
+    @property
+    def short_id(self):
+        """the short form of the test id, used to name the test.
+        """
+        return self.id[:GRIDTEST_ID_LENGTH]
+
     # Running
 
     def get_func(self):
@@ -185,8 +265,8 @@ class GridTest:
         if cleanup is not None:
             self.cleanup_temp = cleanup
 
-        # [passed, result, out, err, raises]
-        passed, result, out, err, raises = test_basic(
+        # [passed, result, out, err, raises, metrics]
+        passed, result, out, err, raises, metrics = test_basic(
             funcname=self.get_funcname(),
             module=self.module,
             func=self.func,
@@ -195,6 +275,9 @@ class GridTest:
             args=self.params.get("args", {}),
             returns=self.params.get("returns"),
             interactive=interactive,
+            result_policy=self.result_policy,
+            output_policy=self.output_policy,
+            profile_file=self.profile_file,
         )
 
         self.success = passed
@@ -202,6 +285,7 @@ class GridTest:
         self.out = out
         self.err = err
         self.raises = raises
+        self.metrics = metrics
 
         # Finish by checking output
         self.check_output()
@@ -272,7 +356,7 @@ class GridTest:
         """
         self.success = False
         value = self.substitute(value)
-        if value == self.result:
+        if self.result_equals(value):
             self.success = True
 
     def check_raises(self, exception):
@@ -319,37 +403,80 @@ class GridTest:
     def check_equals(self, statement):
         """check if a result equals some statement.
         """
-        if not eval(str(statement)) == self.result:
+        if not self.result_equals(eval(str(statement))):
             self.success = False
 
+    def result_equals(self, value):
+        """determine if a value is equal to the result. If the result policy
+           is digest, we compare the digest of the value. If the result was
+           discarded, we cannot check and return False.
+        """
+        if self.result_policy == "discard":
+            self.err.append("result is discarded, cannot compare to %s" % value)
+            return False
+        if self.result_policy == "digest":
+            return digest_result(value) == self.result
+        return value == self.result
+
     def check_metrics(self):
-        """After runs are complete, given metrics defined in params, parse
-           over the list and look for metric output in the output (and remove)
+        """After runs are complete, given metrics defined in params, add any
+           that weren't recorded by their decorator (see record_metric) by
+           looking for lines that start with the metric in the output (and
+           removing them), as custom decorators can print their values. A
+           decorator can also record several values as <metric>.<name>.
         """
         metrics = self.params.get("metrics")
         if metrics:
-            regex = "^(%s)" % "|".join(metrics)
-            self.metrics = {k: [] for k in metrics}
+            printed = [
+                k
+                for k in metrics
+                if not self.metrics.get(k)
+                and not any(x.startswith(k + ".") for x in self.metrics)
+            ]
+            if not printed:
+                return
+            self.metrics.update({k: [] for k in printed})
+            regex = "^(%s)" % "|".join(printed)
             for line in self.out:
-                for metric in metrics:
+                for metric in printed:
                     if line.startswith(metric):
                         self.metrics[metric].append(line.replace(metric, "", 1).strip())
             self.out = [x for x in self.out if not re.search(regex, x)]
 
+    # State
+
+    def get_state(self):
+        """return the outcome of a finished test, e.g., to cache it.
+        """
+        return {
+            "success": self.success,
+            "result": self.result,
+            "out": self.out,
+            "err": self.err,
+            "raises": self.raises,
+            "metrics": self.metrics,
+        }
+
+    def set_state(self, state):
+        """restore the outcome of a test from a state from get_state.
+        """
+        for key, value in state.items():
+            setattr(self, key, value)
+
     # Cleanup and reset
 
     def cleanup(self):
         """Given a list of paths (files or folders) generated by gridtest,
            clean them up with shutil.rm
         """
-        if self.cleanup_temp:
+        if not self.cleanup_temp:
             bot.debug("Skipping cleanup.")
         else:
             for path in self.to_cleanup:
                 if os.path.isfile(path):
                     bot.debug(f"Cleaning up file {path}")
                     os.remove(path)
-                elif os.path.isfile(path):
+                elif os.path.isdir(path):
                     bot.debug(f"Cleaning up directory {path}")
                     shutil.rmtree(path)
 
@@ -365,6 +492,36 @@ class GridTest:
         self.to_cleanup = set()
         self.out = []
         self.err = []
+        self.metrics = {}
+
+    def add_metric(self, metric, first=False):
+        """add a metric (decorator) to the test, e.g., to run all tests with
+           @profile, if the test doesn't already have it. Metrics wrap the
+           function in order, so a metric added first measures only the
+           function, and not the other metrics.
+        """
+        metrics = self.params.setdefault("metrics", [])
+        if first:
+            self.params["metrics"] = [metric] + [x for x in metrics if x != metric]
+        elif metric not in metrics:
+            metrics.append(metric)
+
+    def copy(self):
+        """return a new test (not yet run) with the same function and params,
+           e.g., to run a test again after its source changes.
+        """
+        params = deepcopy(self._params)
+        params["args"] = deepcopy(self.raw_args)
+        return GridTest(
+            module=self.module,
+            name=self.name,
+            func=self.func,
+            filename=self.filename,
+            params=params,
+            verbose=self.verbose,
+            cleanup=self.cleanup_temp,
+            show_progress=self.show_progress,
+        )
 
     def _summary(self, out):
         """return summary for specific output (or error) stream
@@ -433,9 +590,9 @@ class GridRunner:
             sys.exit(f"Cannot find gridtest file {input_file}")
         if not re.search("(yml|yaml)$", input_file):
             sys.exit("Please provide a yaml file (e.g., gridtest.yml) to test.")
-        self.config = read_yaml(input_file)
         self.input_file = input_file
         self.input_dir = os.path.dirname(input_file)
+        self.config = read_config(input_file, self.get_cache_dir())
 
     def set_name(self, name=None):
         """set a custom name. If the user provides a name to the GridRunner,
@@ -483,7 +640,16 @@ class GridRunner:
                         if instance in self.lookup:
                             test["args"]["self"] = self.lookup[instance]
 
-    def run_tests(self, tests, nproc=9, parallel=True, interactive=False, name=None):
+    def run_tests(
+        self,
+        tests,
+        nproc=9,
+        parallel=True,
+        interactive=False,
+        name=None,
+        stream=None,
+        pool=None,
+    ):
         """run tests. By default, we run them in parallel, unless serial
            is selected.
 
@@ -494,16 +660,18 @@ class GridRunner:
             - name (str) : the name of a test to interact with
             - interactive (bool) : run jobs interactively (for debugging)
               not available for parallel jobs.
+            - stream (ResultsStream) : if provided, write each result as it finishes
+            - pool (multiprocessing.Pool) : an existing pool to run parallel tests
         """
         # Parallel tests cannot be interactive
         if parallel and not interactive:
-            self._run_parallel(tests, nproc=nproc)
+            self._run_parallel(tests, nproc=nproc, stream=stream, pool=pool)
 
         else:
             total = len(tests)
             progress = 1
 
-            for _, task in tests.items():
+            for testname, task in tests.items():
                 prefix = "[%s:%s/%s]" % (task.name, progress, total)
                 if self.show_progress:
                     bot.show_progress(progress, total, length=35, prefix=prefix)
@@ -518,26 +686,35 @@ class GridRunner:
 
                 # Run the task, update results with finished object
                 task.run(interactive=is_interactive)
+                if stream:
+                    stream.write(testname, task)
                 progress += 1
 
         return tests
 
-    def _run_parallel(self, tests, nproc=GRIDTEST_WORKERS):
+    def _run_parallel(self, tests, nproc=GRIDTEST_WORKERS, stream=None, pool=None):
         """run tasks in parallel using the Workers class. Returns the same
            tests results, but after running.
 
            Arguments:
               - queue: the list of task objects to run
+              - stream (ResultsStream) : if provided, write each result as it finishes
+              - pool (multiprocessing.Pool) : an existing pool to use
         """
-        workers = Workers(show_progress=self.show_progress, workers=nproc)
-        workers.run(tests)
 
-        # Run final checks
-        for name, test in tests.items():
+        def finish(name, test):
+            """Run final checks as each test finishes
+            """
             test.check_output()
             if test.cleanup_temp:
                 test.cleanup()
+            if stream:
+                stream.write(name, test)
+
+        from gridtest.main.workers import Workers
 
+        workers = Workers(show_progress=self.show_progress, workers=nproc, pool=pool)
+        workers.run(tests, finish=finish)
         return tests
 
     def run(
@@ -555,6 +732,17 @@ class GridRunner:
         save_compact=False,
         save_metrics=None,
         report_template="report",
+        incremental=False,
+        prune_cache=None,
+        last_failed=False,
+        failed_first=False,
+        listener=None,
+        pool=None,
+        profile=None,
+        scaling=None,
+        scaling_metric=None,
+        scaling_limit=None,
+        group_by=None,
     ):
         """run the grid runner, meaning that we turn each function and set of
            tests into a single test, and then run with multiprocessing. 
@@ -570,36 +758,114 @@ class GridRunner:
               - interactive (bool) : interactively debug functions
               - name (str) : if specified, a name of a test to interact with
               - cleanup (bool) : cleanup files/directories generated with tmp_path tmp_dir
-              - save (str) : a filepath to save results to (must be json)
+              - save (str) : a filepath to save results to (json, pkl, or
+                             ndjson/jsonl/sqlite to write results as tests finish)
               - save_report (str) : path to folder (not existing) to save a report to
               - report_template (str) : a template name of a report to generate
+              - incremental (bool) : reuse cached outcomes for unchanged tests
+              - prune_cache (int) : remove cache entries not used in this many days
+              - last_failed (bool) : only run tests that failed in the last run
+              - failed_first (bool) : run tests that failed in the last run first
+              - listener (object) : also write(name, test) to it as tests finish
+              - pool (multiprocessing.Pool) : an existing pool to run parallel tests
+              - profile (str) : run tests with @profile, and save profiles here
+              - scaling (str) : a numeric grid argument to fit a metric's growth with
+              - scaling_metric (str) : the metric to fit (@benchmark.median or @timeit)
+              - scaling_limit (str) : fail if a fit grows faster than this (e.g., n log n)
+              - group_by (list) : if not None, summarize metrics grouped by these args
 
         """
         # 1. Generate list of tests and grid functions
+        started = time.time()
         self.show_progress = show_progress
         self.get_grids()
 
         tests = self.get_tests(regexp=regexp, verbose=verbose, cleanup=cleanup)
 
+        # Optionally select (or move up) tests that failed last time
+        if last_failed or failed_first:
+            tests = self.order_failed(tests, last_failed=last_failed)
+
         # Pretty print results to screen
         if not tests:
             bot.exit_info("No tests to run.")
 
+        # Profiles are collected for all tests, and aren't cached
+        if profile:
+            from gridtest.main.profiles import set_profiles
+
+            set_profiles(profile, tests)
+            incremental = False
+
+        # Streaming results are written as tests finish
+        stream = None
+        if save and re.search("[.](ndjson|jsonl|sqlite|db)$", save):
+            stream = self.get_stream(save)
+        streams = StreamGroup([stream, listener])
+
+        # Incremental runs only run tests that changed
+        torun = tests
+        cache = None
+        if incremental and not interactive:
+            cache = ResultsCache(self.get_cache_dir())
+            torun = cache.load(tests)
+
         # 2. Run tests (serial or in parallel)
-        self.run_tests(
-            tests=tests,
-            parallel=parallel,
-            nproc=nproc or GRIDTEST_WORKERS,
-            interactive=interactive,
-            name=name,
-        )
+        try:
+            self.run_tests(
+                tests=torun,
+                parallel=parallel,
+                nproc=nproc or GRIDTEST_WORKERS,
+                interactive=interactive,
+                name=name,
+                stream=streams,
+                pool=pool,
+            )
+            # Tests reused from the cache don't run, but their args may have
+            # created temporary files or directories
+            for testname, test in tests.items():
+                if testname not in torun:
+                    streams.write(testname, test)
+                    test.cleanup()
+        finally:
+            if stream:
+                stream.close()
+
+        if cache:
+            cache.save(torun)
+            bot.info(cache.summary())
+            if prune_cache is not None:
+                removed = cache.prune(started - prune_cache * 86400)
+                bot.info(f"cache: removed {removed} unused entries.")
+            cache.close()
 
         self.print_results(tests)
+        write_failed(self.get_cache_dir(), tests)
+
+        # Summarize metrics grouped by function and arguments
+        if group_by is not None:
+            print_groups(group_metrics(tests, group_by), group_by)
+
+        if profile:
+            from gridtest.main.profiles import save_profiles
+
+            save_profiles(profile, tests)
+
+        # Fit how a metric grows with a grid argument
+        scaling_code = 0
+        if scaling:
+            from gridtest.main.scaling import get_scaling, print_scaling
+
+            results = get_scaling(tests, scaling, metric=scaling_metric)
+            scaling_code = print_scaling(results, scaling, limit=scaling_limit)
 
         # Save report?
         if save_report:
-            report_dir = self.save_report(save_report, report_template)
-            save = os.path.join(report_dir, "results.json")
+            self.save_report(save_report, report_template, tests, group_by=group_by)
+
+        # Streamed results are already written
+        if stream:
+            save = None
 
         if save_metrics:
             self.save_metrics(save_metrics, tests, save_compact)
@@ -609,10 +875,134 @@ class GridRunner:
             self.save_results(save, tests, save_compact)
 
         # return correct error code
-        if self.failed(tests):
+        if self.failed(tests) or scaling_code:
             return 1
         return 0
 
+    def watch(
+        self,
+        regexp=None,
+        parallel=True,
+        nproc=None,
+        show_progress=True,
+        verbose=False,
+        cleanup=True,
+        interval=None,
+    ):
+        """run the tests, and then watch the gridtest file and the source files
+           of each section for changes. When a source file changes, only the
+           tests for the sections it affects are run again, and when the
+           gridtest file changes, it's loaded again and only tests with new ids
+           are run. Grids are only generated again when the gridtest file
+           changes. Returns the return code for the last run on interrupt.
+
+           Arguments:
+              - regexp (str) : if supplied, filter to this pattern
+              - parallel (bool) : use multiprocessing to run tasks (default True)
+              - nproc (int) : number of processes to use for parallel testing
+              - show_progress (bool) : show progress instead of task information
+              - verbose (bool) : print success output too
+              - cleanup (bool) : cleanup files/directories generated with tmp_path tmp_dir
+              - interval (float) : seconds to wait between checks for changes
+        """
+        from gridtest.main.watch import Watcher
+
+        self.show_progress = show_progress
+        watcher = Watcher(self, interval=interval)
+        nproc = nproc or GRIDTEST_WORKERS
+
+        # Finished tests are kept by name, which is stable for the same test
+        done = {}
+        tests = {}
+        reload, sections = True, set()
+        return_code = 0
+
+        try:
+            while True:
+                started = time.time()
+                if reload:
+                    if tests:
+                        self.load(self.input_file)
+                        self._fill_classes()
+                        watcher.update()
+                    self.grids = {}
+                    self.get_grids()
+                    tests = self.get_tests(
+                        regexp=regexp, verbose=verbose, cleanup=cleanup
+                    )
+
+                    # Finished tests are kept, and the new copies (with any
+                    # temporary paths their args created) are cleaned up
+                    for name, test in tests.items():
+                        if name in done:
+                            test.cleanup()
+                            tests[name] = done[name]
+
+                # Tests for changed sources are run again as new tests
+                for name, test in tests.items():
+                    if test.module in sections and name in done:
+                        tests[name] = test.copy()
+                        del done[name]
+
+                torun = {name: test for name, test in tests.items() if name not in done}
+                if torun:
+                    self.run_tests(
+                        tests=torun,
+                        parallel=parallel,
+                        nproc=min(nproc, len(torun)),
+                    )
+                    done.update(torun)
+                    self.print_results(torun)
+                    write_failed(self.get_cache_dir(), tests)
+
+                return_code = 1 if self.failed(tests) else 0
+                bot.info(
+                    "watch: ran %s of %s tests in %.2f seconds, waiting for changes."
+                    % (len(torun), len(tests), time.time() - started)
+                )
+                reload, sections = watcher.wait()
+
+        except KeyboardInterrupt:
+            return return_code
+
+    def order_failed(self, tests, last_failed=False):
+        """Given a lookup of tests, return the tests that failed in the last
+           run first, followed by the rest (unless last_failed is True). If
+           there are no failures recorded (or found), all tests are returned.
+
+           Arguments:
+            - tests (dict) : the lookup of tests, keyed by name
+            - last_failed (bool) : only return tests that failed last time
+        """
+        failed = read_failed(self.get_cache_dir())
+        if not failed:
+            bot.info("No failed tests recorded, running all tests.")
+            return tests
+
+        first = {}
+        rest = {}
+        for name, test in tests.items():
+            if test.id in failed:
+                first[name] = test
+            elif not last_failed:
+                rest[name] = test
+
+        # Failures are recorded by id, so a changed test is no longer found
+        if not first:
+            bot.info("No failed tests from the last run found, running all tests.")
+            return tests
+
+        bot.info(f"Running {len(first)} tests that failed last time.")
+        first.update(rest)
+        return first
+
+    def get_cache_dir(self):
+        """the cache directory holds state between runs, and is
+           GRIDTEST_CACHE_DIR if defined, otherwise .gridtest_cache alongside
+           the test file.
+        """
+        return GRIDTEST_CACHE_DIR or os.path.join(self.input_dir, ".gridtest_cache")
+
     def success(self, tests):
         """Given a test of tests, return True if all are successful.
         """
@@ -629,8 +1019,15 @@ class GridRunner:
         bot.info(f"Writing {self} to {testfile}")
         write_yaml(self.config, testfile)
 
-    def save_report(self, report_dir, report_template):
-        """save a runner results to file.
+    def save_report(self, report_dir, report_template, tests=None, group_by=None):
+        """save a runner results to file. The report data is a summary.json
+           and pages of tests for each function, loaded by the report as needed.
+
+           Arguments:
+            - report_dir (str) : the report directory to create (cannot exist)
+            - report_template (str) : the name of the report template
+            - tests (dict) : if provided, the finished tests to write data for
+            - group_by (list) : if not None, add metrics grouped by these arguments
         """
         report_dir = os.path.abspath(report_dir)
 
@@ -641,6 +1038,8 @@ class GridRunner:
         dest = copy_template(report_template, report_dir)
         if not dest:
             bot.exit(f"Error writing to {dest}.")
+        if tests is not None:
+            write_report_data(dest, tests, group_by=group_by)
         return dest
 
     def _savepaths_valid(self, filename, allowed=None):
@@ -662,37 +1061,76 @@ class GridRunner:
             return False
         return True
 
+    def get_stream(self, filename):
+        """Given a filename ending in .ndjson or .jsonl, return an opened
+           ResultsStream to write results to as tests finish. For a filename
+           ending in .sqlite or .db, return an opened ResultsDatabase that
+           adds the run to a (possibly existing) database.
+
+           Arguments:
+            - filename (str) : the ndjson, jsonl, sqlite, or db file to stream to
+        """
+        filename = os.path.abspath(filename)
+        allowed = [".ndjson", ".jsonl", ".sqlite", ".db"]
+        if not self._savepaths_valid(filename, allowed=allowed):
+            return
+
+        if re.search("[.](sqlite|db)$", filename):
+            from gridtest.main.database import ResultsDatabase
+
+            stream = ResultsDatabase(
+                filename, name=self.name, input_file=self.input_file
+            )
+        else:
+            stream = ResultsStream(filename)
+        stream.open()
+        return stream
+
     def save_metrics(self, filename, tests, save_compact=False):
         """save metrics to file. This is the same data as a general results
-           export, but without the results, and without the params.
+           export, but without the results, and with only the args of the
+           params. A csv, parquet, or npz export is columnar, with one column
+           per grid argument and metric.
 
            Arguments:
-            - filename (str) : the json file to save to (must end in json)
+            - filename (str) : the json, csv, parquet or npz file to save to
             - tests (gridtest.main.test.GridTest) : the gridtest object
             - save_compact (bool) : don't pretty print
         """
         filename = os.path.abspath(filename)
-        if self._savepaths_valid(filename, allowed=[".json"]):
-            results = []
-            for key, test in tests.items():
-
-                if test.params.get("save", True) == False:
-                    continue
-
-                results.append(
-                    {
-                        "name": key,
-                        "function": test.name,
-                        "filename": test.filename,
-                        "raises": test.raises,
-                        "success": test.success,
-                        "metrics": test.metrics,
-                        "module": test.module,
-                    }
-                )
+        allowed = [".json", ".csv", ".parquet", ".npz"]
+        if not self._savepaths_valid(filename, allowed=allowed):
+            return
+
+        if filename.endswith(".csv"):
+            return MetricsTable(tests).write_csv(filename)
+        elif filename.endswith(".parquet"):
+            return MetricsTable(tests).write_parquet(filename)
+        elif filename.endswith(".npz"):
+            return MetricsTable(tests).write_npz(filename)
+
+        results = []
+        for key, test in tests.items():
+
+            if test.params.get("save", True) == False:
+                continue
+
+            results.append(
+                {
+                    "name": key,
+                    "id": test.id,
+                    "function": test.name,
+                    "filename": test.filename,
+                    "args": test.params.get("args", {}),
+                    "raises": test.raises,
+                    "success": test.success,
+                    "metrics": test.metrics,
+                    "module": test.module,
+                }
+            )
 
-            write_json(results, filename, pretty=not save_compact)
-            return filename
+        write_json(results, filename, pretty=not save_compact)
+        return filename
 
     def save_results(self, filename, tests, save_compact=False):
         """save a runner results to file.
@@ -703,28 +1141,14 @@ class GridRunner:
             - save_compact (bool) : don't pretty print
         """
         filename = os.path.abspath(filename)
-        if self._savepaths_valid(filename):
+        if self._savepaths_valid(filename, allowed=[".json", ".pkl", ".msgpack"]):
             results = []
             for key, test in tests.items():
 
                 if test.params.get("save", True) == False:
                     continue
 
-                results.append(
-                    {
-                        "name": key,
-                        "function": test.name,
-                        "filename": test.filename,
-                        "out": test.out,
-                        "err": test.err,
-                        "result": test.result,
-                        "params": test.params,
-                        "raises": test.raises,
-                        "success": test.success,
-                        "metrics": test.metrics,
-                        "module": test.module,
-                    }
-                )
+                results.append(get_result(key, test))
 
             if filename.endswith(".json"):
                 try:
@@ -734,6 +1158,9 @@ class GridRunner:
 
             elif filename.endswith(".pkl"):
                 save_pickle(results, filename)
+
+            elif filename.endswith(".msgpack"):
+                write_msgpack(results, filename)
             return filename
 
     def print_results(self, tests):
@@ -765,7 +1192,9 @@ class GridRunner:
             print("\n{:_<120}".format(""))
         for name, test in tests.items():
             for metric, result in test.metrics.items():
-                print("{:<30} {:<30} {:<30}".format(name, metric, "|".join(result)))
+                print(
+                    "{:<30} {:<30} {:<30}".format(name, metric, format_metric(result))
+                )
 
         print(f"\n{success}/{total} tests passed")
 
@@ -784,12 +1213,15 @@ class GridRunner:
         return self.grids
 
     def get_tests(self, regexp=None, verbose=False, cleanup=True):
-        """get tests based on a regular expression.
+        """get tests based on a regular expression. Each test is keyed by the
+           function name and the short form of its id (derived from the argset
+           and checks) so names are stable when a grid changes.
 
            Arguments:
             - regexp (str) : if provided, only include those tests that match.
         """
         tests = {}
+        seen = {}
 
         for parent, section in self.config.items():
             for name, module in section.get("tests", {}).items():
@@ -857,7 +1289,7 @@ class GridRunner:
                             if extra_args:
                                 updated["args"]["self"] = extra_args
 
-                            tests["%s.%s" % (name, idx)] = GridTest(
+                            test = GridTest(
                                 module=parent,
                                 name=name,
                                 params=updated,
@@ -866,6 +1298,13 @@ class GridRunner:
                                 filename=filename,
                                 show_progress=self.show_progress,
                             )
+
+                            # Tests are named by id, repeated argsets are numbered
+                            key = "%s.%s" % (name, test.short_id)
+                            seen[key] = seen.get(key, 0) + 1
+                            if seen[key] > 1:
+                                key = "%s-%s" % (key, seen[key] - 1)
+                            tests[key] = test
                             print(f"generating test {idx}", end="\r")
                             idx += 1
         return tests
@@ -9,14 +9,20 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 from gridtest.main.test import GridRunner
-from gridtest.main.generate import extract_modulename, extract_functions
+from gridtest.main.generate import extract_modulename, extract_files
+from gridtest.main.check import TestNames
 import os
 import re
 import sys
 
 
 def update_tests(
-    testfile, include_private=False, skip_patterns=None, include_classes=True
+    testfile,
+    include_private=False,
+    skip_patterns=None,
+    include_classes=True,
+    static=True,
+    nproc=None,
 ):
     """Given a testing file, load in as a GridRunner, load the module again,
        and update with new tests not found. Optionally take patterns
@@ -28,6 +34,8 @@ def update_tests(
           - include_private (bool) : include "private" functions
           - skip_patterns (list) : list of test keys (patterns) to exclude
           - include_classes (bool) : include classes in update (True)
+          - static (bool) : parse source files instead of importing (True)
+          - nproc (int) : the number of workers to parse files with
     """
     if not os.path.exists(testfile):
         sys.exit(f"{testfile} does not exist.")
@@ -35,35 +43,34 @@ def update_tests(
     if not re.search("[.](yml|yaml)$", testfile):
         sys.exit("Test file must have yml|yaml extension.")
 
-    skip_patterns = skip_patterns or []
     runner = GridRunner(testfile)
 
     # The config holds the filename we derive tests from, and tests, keep a lookup
-    files = []
-    existing = set()
-
-    for name, section in runner.config.items():
-        # Get either the file path, module name, or relative path
-        filename = extract_modulename(
-            section.get("filename"), os.path.dirname(testfile)
-        )
-        files.append(filename)
-        [existing.add(x) for x in section.get("tests", {}).keys()]
-        functions = extract_functions(
-            filename, include_private, quiet=True, include_classes=include_classes
-        )
-
-        # Regular expression for existing takes into account different import paths
-        regex = "(%s)$" % "|".join(list(existing) + skip_patterns)
-        for key, params in functions.items():
+    files = [
+        extract_modulename(section.get("filename"), os.path.dirname(testfile))
+        for section in runner.config.values()
+    ]
+    extracted = extract_files(
+        files,
+        include_private,
+        quiet=True,
+        include_classes=include_classes,
+        static=static,
+        nproc=nproc,
+        cache_dir=runner.get_cache_dir(),
+    )
+    for (name, section), functions in zip(list(runner.config.items()), extracted):
+        existing = TestNames(section.get("tests", {}), skip_patterns)
+        for key, params in functions.get("tests", {}).items():
 
             # Make sure functions start with same name as previous level
             if name in key:
                 key = name + ".".join([x for x in key.split(name)[1:] if x != "."])
 
-            if not re.search(regex, key):
+            if key not in existing:
                 print(f"Adding function {key}")
-                runner.config[name][key] = params
+                section.setdefault("tests", {})[key] = params
+                existing.add(key)
 
     # Save back to file
     runner.save(testfile)
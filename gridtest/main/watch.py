@@ -0,0 +1,136 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+from gridtest.defaults import GRIDTEST_WATCH_INTERVAL
+from gridtest.main.cache import get_local_imports, get_module_path
+from gridtest.main.generate import extract_modulename
+import time
+import sys
+import os
+
+
+def get_source_files(filename, seen=None):
+    """Given a python source file, return it and (transitively) the local
+       modules that it imports, which are the files that affect its tests.
+
+       Arguments:
+        - filename (str) : the path to the python source file
+        - seen (set) : files already included (to avoid import cycles)
+    """
+    filename = os.path.abspath(filename)
+    seen = seen if seen is not None else set()
+    seen.add(filename)
+    try:
+        with open(filename, "rb") as fd:
+            content = fd.read()
+    except OSError:
+        return seen
+
+    for path in get_local_imports(filename, content):
+        if os.path.abspath(path) not in seen:
+            get_source_files(path, seen)
+    return seen
+
+
+def get_section_sources(runner):
+    """Given a runner, return a lookup of the source files for its sections
+       (and the local modules they import), each with the sections it affects.
+
+       Arguments:
+        - runner (gridtest.main.test.GridRunner) : the runner with a config
+    """
+    sources = {}
+    for parent, section in runner.config.items():
+        filename = extract_modulename(section.get("filename", ""), runner.input_dir)
+        path = get_module_path(parent, filename)
+        if not path:
+            continue
+        for source in get_source_files(path):
+            sources.setdefault(source, set()).add(parent)
+    return sources
+
+
+def get_mtime(filename):
+    """return the modified time and size of a file, or None if it's missing.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def forget_modules(paths):
+    """remove modules loaded from any of a list of paths from sys.modules, so
+       they are imported again (e.g., when running tests in serial).
+    """
+    paths = set(os.path.abspath(path) for path in paths)
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename and os.path.abspath(filename) in paths:
+            del sys.modules[name]
+
+
+class Watcher:
+    def __init__(self, runner, interval=None):
+        """A watcher polls the gridtest file of a runner, and the source files
+           of each of its sections (and the local modules they import) for
+           changes. Polling a handful of files with os.stat is cheap, and
+           doesn't require an inotify (or other platform specific) library.
+
+           Arguments:
+            - runner (gridtest.main.test.GridRunner) : the runner to watch
+            - interval (float) : seconds to wait between checks
+        """
+        self.runner = runner
+        self.interval = interval or GRIDTEST_WATCH_INTERVAL
+        self.update()
+
+    def update(self):
+        """update the lookup of watched files, each with the sections (the
+           modules of the tests) that it affects. This should be called when
+           the gridtest file is loaded again.
+        """
+        self.sources = get_section_sources(self.runner)
+        self.sources[self.runner.input_file] = set()
+        self.mtimes = self.snapshot()
+
+    def snapshot(self):
+        return {path: get_mtime(path) for path in self.sources}
+
+    def changed(self):
+        """return the list of watched files that changed since the last check.
+        """
+        mtimes = self.snapshot()
+        changed = [path for path, mtime in mtimes.items() if mtime != self.mtimes[path]]
+        self.mtimes = mtimes
+        return changed
+
+    def wait(self):
+        """wait for one or more watched files to change, and return a tuple
+           with a boolean (True if the gridtest file changed) and the set of
+           sections with changed sources.
+        """
+        changed = []
+        while not changed:
+            time.sleep(self.interval)
+            changed = self.changed()
+
+        forget_modules(changed)
+        sections = set()
+        for path in changed:
+            sections.update(self.sources[path])
+        return self.runner.input_file in changed, sections
+
+    def __repr__(self):
+        return "[watcher|%s]" % self.runner.input_file
+
+    def __str__(self):
+        return "[watcher|%s]" % self.runner.input_file
@@ -11,6 +11,7 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 from gridtest.logger import bot
 from gridtest.defaults import GRIDTEST_WORKERS
 from gridtest.main.helpers import test_basic
+from collections import deque
 import multiprocessing
 import itertools
 import time
@@ -20,12 +21,15 @@ import os
 
 
 class Workers(object):
-    def __init__(self, workers=None, show_progress=False):
+    def __init__(self, workers=None, show_progress=False, pool=None):
 
         if workers is None:
             workers = GRIDTEST_WORKERS
         self.workers = workers
         self.show_progress = show_progress
+
+        # A pool can be provided (e.g., kept warm by a server) and isn't closed
+        self.pool = pool
         bot.debug("Using %s workers for multiprocess." % (self.workers))
 
     def start(self):
@@ -37,12 +41,13 @@ class Workers(object):
         self.runtime = self.runtime = self.end_time - self.start_time
         bot.debug("Ending multiprocess, runtime: %s sec" % (self.runtime))
 
-    def run(self, tests, cleanup=True):
+    def run(self, tests, cleanup=True, finish=None):
         """run will execute a test for each entry in the list of tests.
            the result of the test, and error codes, are saved with the test.
         
            Arguments:
                - tests (gridtest.main.test.GridTest) : the GridTest object
+               - finish (function) : called with (name, test) as each finishes
         """
 
         # Keep track of some progress for the user
@@ -53,13 +58,14 @@ class Workers(object):
         if not tests:
             return
 
-        results = []
+        # Results are collected in the order submitted (first done first)
+        results = deque()
 
         try:
             prefix = "[%s/%s]" % (progress, total)
             if self.show_progress:
                 bot.show_progress(0, total, length=35, prefix=prefix)
-            pool = multiprocessing.Pool(self.workers, init_worker)
+            pool = self.pool or multiprocessing.Pool(self.workers, init_worker)
 
             self.start()
             for name, task in tests.items():
@@ -75,6 +81,9 @@ class Workers(object):
                     "metrics": task.params.get("metrics", []),
                     "args": task.params.get("args", {}),
                     "returns": task.params.get("returns"),
+                    "result_policy": task.result_policy,
+                    "output_policy": task.output_policy,
+                    "profile_file": task.profile_file,
                 }
 
                 if not self.show_progress:
@@ -83,13 +92,12 @@ class Workers(object):
                     multi_wrapper, multi_package(test_basic, [params])
                 )
 
-                # result returns [passed, result, out, error]
+                # result returns [passed, result, out, error, raises, metrics]
                 # Store the test with the result
-                results.append((task, result))
+                results.append((name, task, result))
 
             while results:
-                pair = results.pop()
-                test, result = pair
+                name, test, result = results.popleft()
                 result.wait()
                 if self.show_progress:
                     bot.show_progress(progress, total, length=35, prefix=prefix)
@@ -97,23 +105,31 @@ class Workers(object):
                 prefix = "[%s/%s]" % (progress, total)
 
                 # Update the task with the result
-                passed, result, out, err, raises = result.get()
+                passed, result, out, err, raises, metrics = result.get()
+                test.metrics = metrics
                 test.out = out
                 test.err = err
                 test.success = passed
                 test.result = result
                 test.raises = raises
+                if finish:
+                    finish(name, test)
 
             self.end()
-            pool.close()
-            pool.join()
+            if not self.pool:
+                pool.close()
+                pool.join()
 
+        # A pool that was passed in (e.g., by a server) is left to its owner
         except (KeyboardInterrupt, SystemExit):
             bot.error("Keyboard interrupt detected, terminating workers!")
-            pool.terminate()
+            if not self.pool:
+                pool.terminate()
             sys.exit(1)
 
         except:
+            if not self.pool:
+                pool.terminate()
             bot.exit("Error running task.")
 
 
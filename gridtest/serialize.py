@@ -0,0 +1,169 @@
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+gridtest.serialize provides serializers to write results and metrics.
+Plain json types are handled by the (C accelerated) encoder of the backend,
+and anything else (NumPy arrays and scalars, sets, bytes, objects) is
+converted by to_serializable. orjson and msgpack are used if installed.
+
+"""
+
+from gridtest.defaults import GRIDTEST_SERIALIZER
+from gridtest.logger import bot
+import json
+
+
+def to_serializable(obj):
+    """A default handler for types that aren't native to json. NumPy arrays
+       and scalars (and anything else with tolist) are converted to lists
+       or Python scalars, and we fall back to the repr of the object.
+
+       Arguments:
+        - obj (object) : the object the encoder doesn't know how to serialize
+    """
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", "replace")
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return repr(obj)
+
+
+class JsonSerializer:
+    """serialize to json using the Python standard library json module.
+    """
+
+    name = "json"
+    extension = ".json"
+
+    def dumps(self, obj, pretty=False):
+        if pretty:
+            return json.dumps(
+                obj, indent=4, separators=(",", ": "), default=to_serializable
+            )
+        return json.dumps(obj, separators=(",", ":"), default=to_serializable)
+
+    def dumpb(self, obj, pretty=False):
+        return self.dumps(obj, pretty=pretty).encode("utf-8")
+
+    def loads(self, content):
+        return json.loads(content)
+
+    def __repr__(self):
+        return "[serializer|%s]" % self.name
+
+    def __str__(self):
+        return "[serializer|%s]" % self.name
+
+
+class OrjsonSerializer(JsonSerializer):
+    """serialize to json using orjson, falling back to the standard library
+       for content it doesn't support (e.g., integers larger than 64 bits).
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+        self.options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumpb(self, obj, pretty=False):
+        options = self.options
+        if pretty:
+            options |= self.orjson.OPT_INDENT_2
+        try:
+            return self.orjson.dumps(obj, default=to_serializable, option=options)
+        except TypeError:
+            return super().dumpb(obj, pretty=pretty)
+
+    def dumps(self, obj, pretty=False):
+        return self.dumpb(obj, pretty=pretty).decode("utf-8")
+
+    def loads(self, content):
+        return self.orjson.loads(content)
+
+
+class JsonTricksSerializer(JsonSerializer):
+    """serialize to json using json_tricks, which can round trip NumPy
+       arrays and class instances at the cost of speed.
+    """
+
+    name = "json_tricks"
+
+    def dumps(self, obj, pretty=False):
+        from json_tricks import dumps
+
+        if pretty:
+            return dumps(obj, indent=4, separators=(",", ": "))
+        return dumps(obj)
+
+    def loads(self, content):
+        from json_tricks import loads
+
+        return loads(content)
+
+
+class MsgpackSerializer(JsonSerializer):
+    """serialize to the binary msgpack format.
+    """
+
+    name = "msgpack"
+    extension = ".msgpack"
+
+    def __init__(self):
+        import msgpack
+
+        self.msgpack = msgpack
+
+    def dumpb(self, obj, pretty=False):
+        return self.msgpack.packb(obj, default=to_serializable, use_bin_type=True)
+
+    def dumps(self, obj, pretty=False):
+        bot.exit("msgpack is a binary format, use dumpb instead.")
+
+    def loads(self, content):
+        return self.msgpack.unpackb(content, raw=False)
+
+
+serializers = {
+    "json": JsonSerializer,
+    "orjson": OrjsonSerializer,
+    "json_tricks": JsonTricksSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def get_serializer(name=None):
+    """Get a serializer by name. The default (auto) is orjson if installed,
+       and otherwise the standard library json. Exit if an optional serializer
+       is requested but not installed.
+
+       Arguments:
+        - name (str) : one of auto, json, orjson, json_tricks, msgpack
+    """
+    name = name or GRIDTEST_SERIALIZER
+    if name == "auto":
+        try:
+            return OrjsonSerializer()
+        except ImportError:
+            return JsonSerializer()
+
+    if name not in serializers:
+        bot.exit(
+            "%s is not a known serializer, choices are auto, %s"
+            % (name, ", ".join(serializers))
+        )
+    try:
+        return serializers[name]()
+    except ImportError:
+        bot.exit(f"The {name} serializer is requested but {name} is not installed.")
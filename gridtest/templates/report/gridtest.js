@@ -4,13 +4,16 @@ Vue.component("modal", {
     template: "#modal-template"
 });
 
+// The table is virtualized: only rows in view (plus a buffer) are rendered
+var rowHeight = 41
+var rowBuffer = 10
+
 Vue.component('grid-tests', {
   template: '#grid-template',
   props: {
     heroes: Array,
     columns: Array,
     filterKey: String,
-    tests: Object,
     showModal: false,
     mouseover: { type: Function },
   },
@@ -21,7 +24,9 @@ Vue.component('grid-tests', {
     })
     return {
       sortKey: '',
-      sortOrders: sortOrders
+      sortOrders: sortOrders,
+      scrollTop: 0,
+      viewHeight: 600
     }
   },
   computed: {
@@ -30,23 +35,53 @@ Vue.component('grid-tests', {
       var filterKey = this.filterKey && this.filterKey.toLowerCase()
       var order = this.sortOrders[sortKey] || 1
       var heroes = this.heroes
+
+      // Rows that aren't loaded yet are undefined, and kept as placeholders
       if (filterKey) {
         heroes = heroes.filter(function (row) {
-          return Object.keys(row).some(function (key) {
+          return row && Object.keys(row).some(function (key) {
             return String(row[key]).toLowerCase().indexOf(filterKey) > -1
           })
         })
       }
       if (sortKey) {
         heroes = heroes.slice().sort(function (a, b) {
-          a = a[sortKey]
-          b = b[sortKey]
+          a = a ? a[sortKey] : undefined
+          b = b ? b[sortKey] : undefined
           return (a === b ? 0 : a > b ? 1 : -1) * order
         })
       }
       return heroes
+    },
+    start: function () {
+      return Math.max(0, Math.floor(this.scrollTop / rowHeight) - rowBuffer)
+    },
+    end: function () {
+      var end = Math.ceil((this.scrollTop + this.viewHeight) / rowHeight) + rowBuffer
+      return Math.min(this.filteredHeroes.length, end)
+    },
+    visibleHeroes: function () {
+      var start = this.start
+      return this.filteredHeroes.slice(start, this.end).map(function (row, i) {
+        return {index: start + i, row: row}
+      })
+    },
+    padTop: function () {
+      return this.start * rowHeight
+    },
+    padBottom: function () {
+      return (this.filteredHeroes.length - this.end) * rowHeight
     }
   },
+  watch: {
+    start: function () { this.requestRange() },
+    end: function () { this.requestRange() },
+    heroes: function () { this.requestRange() }
+  },
+  mounted: function () {
+    this.viewHeight = this.$el.clientHeight || this.viewHeight
+    this.requestRange()
+  },
   filters: {
     capitalize: function (str) {
       return str.charAt(0).toUpperCase() + str.slice(1)
@@ -56,6 +91,13 @@ Vue.component('grid-tests', {
     sortBy: function (key) {
       this.sortKey = key
       this.sortOrders[key] = this.sortOrders[key] * -1
+      this.$emit('load-all')
+    },
+    onScroll: function (event) {
+      this.scrollTop = event.target.scrollTop
+    },
+    requestRange: function () {
+      this.$emit('range', this.start, this.end)
     }
   }
 })
@@ -63,17 +105,87 @@ Vue.component('grid-tests', {
 var demo = new Vue({
   el: '#main',
   created: function() {
-      this.fetchData();
+      this.fetchSummary();
+  },
+  watch: {
+    searchQuery: function (query) {
+      if (query) { this.loadAll() }
+    }
   },
   methods: {
 
-    activate: function(name) {
-        if (this.lookup.hasOwnProperty(name)) {
-           this.gridData = this.lookup[name]
+    // Load the summary first, and then pages of tests as they are viewed
+    fetchSummary: function () {
+      var self = this;
+      this.fetchJson("summary.json", function (summary) {
+        self.summary = summary
+        if (summary.functions.length > 0) {
+          self.activate(0)
         }
+      })
+    },
+
+    fetchJson: function (url, callback) {
+      var xhr = new XMLHttpRequest()
+      xhr.open('GET', url)
+      xhr.onload = function () {
+        callback(JSON.parse(xhr.responseText))
+      }
+      xhr.send()
+    },
+
+    activate: function(index) {
+      this.active = this.summary.functions[index]
+      this.loaded = Object()
+      this.gridData = Array.from({length: this.active.total})
+    },
+
+    // Given a range of rows in view, load the pages that contain them
+    loadRange: function (start, end) {
+      if (!this.active) { return }
+      var size = this.summary.page_size
+      var last = Math.min(Math.ceil(end / size), this.active.pages.length)
+      for (var page = Math.floor(start / size); page < last; page++) {
+        this.loadPage(page)
+      }
+    },
+
+    // Searching and sorting need every test for the active function
+    loadAll: function () {
+      if (!this.active) { return }
+      for (var page = 0; page < this.active.pages.length; page++) {
+        this.loadPage(page)
+      }
+    },
+
+    loadPage: function (page) {
+      var self = this;
+      var active = this.active
+      if (this.loaded.hasOwnProperty(page)) { return }
+      this.loaded[page] = true
+
+      this.fetchJson(active.pages[page], function (records) {
+
+        // The user moved on to a different function
+        if (self.active !== active) { return }
+
+        var rows = self.gridData.slice()
+        var offset = page * self.summary.page_size
+        $.each(records, function(i, e){
+          self.tests[e['name']] = e
+          rows[offset + i] = {module: e['module'],
+                              name: e['name'],
+                              success: e['success'],
+                              args: e['args'],
+                              raises: e['raises'],
+                              result: e['result']}
+        })
+        self.gridData = rows
+      })
     },
 
     mouseover: function(name) {
+      if (!this.tests.hasOwnProperty(name)) { return }
       var metrics = ""
       $.each(this.tests[name]['metrics'], function(i,e){
           metrics += (i + ": " + e + "<br>")
@@ -90,56 +202,6 @@ var demo = new Vue({
       this.modalHeader = name;
       this.modalBody = body
       this.showModal = true;
-    },
-
-    fetchData: function () {
-
-      var self = this;
-      self.tests = Object()
-      self.sidebar = Object()
-
-      var xhr = new XMLHttpRequest()
-      xhr.open('GET', "results.json")
-      xhr.onload = function () {
-        raw = JSON.parse(xhr.responseText)
-
-        $.each(raw, function(i,e){
-
-          // Truncate result
-          var slug = e['result']
-          if (slug.length > 80){
-            slug = slug.slice(0,79);
-          }
-          self.tests[e['name']] = e
-
-          // We haven't added the function to the lookup yet
-          if (! self.lookup.hasOwnProperty(e['function'])) {
-            self.lookup[e['function']] = Array()
-          }
-
-          // If not yet added to sidebar lookup
-          if (! self.sidebar.hasOwnProperty(e['function'])) {
-            self.sidebar[e['function']] = {name: e['function'], success: e['success']}
-          }
-          // If we have a failure, entire set is considered failure 
-          if (e['success'] == "false") {
-            self.sidebar[e['function']]['success'] = e['success']
-          }
-          self.lookup[e['function']].push({module: e['module'],
-                                           name: e['name'], 
-                                           success: e['success'],
-                                           params: e['params']['args'],
-                                           raises: e['raises'],
-                                           result: slug})
-          })
-                
-          // Set the table to be the first in the sidebar 
-          if (Object.keys(self.lookup).length > 0) {
-            self.gridData = self.lookup[Object.keys(self.lookup)[0]]
-            console.log(self.gridData);
-          }
-       }
-       xhr.send()
     }
   },
   data: {
@@ -148,8 +210,10 @@ var demo = new Vue({
     modalHeader: "",
     modalFooter: "",
 
-    sidebar: Object(),
-    lookup: Object(),
+    summary: {total: 0, success: 0, failure: 0, functions: []},
+    active: null,
+    loaded: Object(),
+    tests: Object(),
     searchQuery: '',
     gridColumns: ['module', 'name', 'success', 'args', 'raises', 'result'],
     gridData: Array(),
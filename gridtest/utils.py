@@ -8,9 +8,8 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 """
 
-from json_tricks import dumps, loads
+from gridtest.serialize import get_serializer
 import pickle
-import yaml
 import fnmatch
 import os
 
@@ -44,14 +43,29 @@ def read_file(filename, readlines=True):
     return content
 
 
+def load_yaml(content):
+    """load yaml content with the libyaml (C) safe loader if available. Content
+       with python tags (e.g., !!python/tuple) that the safe loader can't
+       construct is loaded with the full loader, as it was before.
+
+       Arguments:
+         - content (str) : the yaml content to load
+    """
+    import yaml
+
+    try:
+        return yaml.load(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    except yaml.constructor.ConstructorError:
+        return yaml.load(content, Loader=getattr(yaml, "CFullLoader", yaml.FullLoader))
+
+
 def read_yaml(filename):
     """read a yaml file, only including sections between dashes
 
        Arguments:
          - filename (str) : the filename to read
     """
-    stream = read_file(filename, readlines=False)
-    return yaml.load(stream, Loader=yaml.FullLoader)
+    return load_yaml(read_file(filename, readlines=False))
 
 
 def write_yaml(yaml_dict, filename):
@@ -61,24 +75,40 @@ def write_yaml(yaml_dict, filename):
         - yaml_dict (dict) : the dict to print to yaml
         - filename (str) : the output file to write to
     """
+    import yaml
+
     with open(filename, "w") as filey:
-        filey.writelines(yaml.dump(yaml_dict))
+        filey.writelines(
+            yaml.dump(yaml_dict, Dumper=getattr(yaml, "CDumper", yaml.Dumper))
+        )
     return filename
 
 
-def write_json(json_obj, filename, pretty=True):
+def write_json(json_obj, filename, pretty=True, serializer=None):
     """write_json will write a json object to file, pretty printed
 
        Arguments:
         - json_obj (dict) : the dict to print to json
         - filename (str) : the output file to write to
         - pretty (bool): if True, will use nicer formatting
+        - serializer (str) : the serializer to use (defaults to auto)
     """
-    with open(filename, "w") as filey:
-        if pretty:
-            filey.writelines(dumps(json_obj, indent=4, separators=(",", ": ")))
-        else:
-            filey.writelines(dumps(json_obj))
+    serializer = get_serializer(serializer)
+    with open(filename, "wb") as filey:
+        filey.write(serializer.dumpb(json_obj, pretty=pretty))
+    return filename
+
+
+def write_msgpack(json_obj, filename):
+    """write a json object to file in the binary msgpack format (requires
+       msgpack to be installed).
+
+       Arguments:
+        - json_obj (dict) : the dict to save
+        - filename (str) : the output file to write to
+    """
+    with open(filename, "wb") as filey:
+        filey.write(get_serializer("msgpack").dumpb(json_obj))
     return filename
 
 
@@ -89,6 +119,8 @@ def read_json(input_file):
         - input_file (str) : file to read from
     """
     with open(input_file, "r") as filey:
+        from json_tricks import loads
+
         data = loads(filey.read())
     return data
 
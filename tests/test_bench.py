@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+import math
+import os
+
+
+def test_t_distribution():
+    """Test Welch's t-test against closed forms of the t distribution"""
+    from gridtest.main.stats import t_sf, welch_test
+
+    for t in [-3, -0.5, 0, 1, 2.5]:
+        assert math.isclose(t_sf(t, 1), 0.5 - math.atan(t) / math.pi)
+        assert math.isclose(t_sf(t, 2), 0.5 - t / (2 * math.sqrt(t * t + 2)))
+    assert round(t_sf(2.0, 5), 6) == 0.05097
+
+    assert welch_test((1.0, 0.05, 5), (1.2, 0.05, 5)) < 0.001
+    assert welch_test((1.2, 0.05, 5), (1.0, 0.05, 5)) > 0.999
+
+
+def test_bench_baseline(tmp_path, monkeypatch):
+    """Test saving benchmarks as a baseline, and comparing to it"""
+    from gridtest.main.test import GridTestFunc
+    from gridtest.main.bench import save_baseline, read_baseline, compare_baseline
+    import gridtest.decorators
+
+    monkeypatch.setattr(gridtest.decorators, "GRIDTEST_BENCH_TIME", 0.001)
+
+    def add(one, two):
+        return one + two
+
+    tests = {}
+    for name, tolerance in [("add.fast", 0.1), ("add.tolerant", 100)]:
+        params = {"args": {"one": 1, "two": 2}, "metrics": ["@benchmark"]}
+        params["tolerance"] = tolerance
+        tests[name] = GridTestFunc(add, params=params)
+        tests[name].run()
+
+    filename = os.path.join(str(tmp_path), "baseline.json")
+    save_baseline(filename, tests)
+    baseline = read_baseline(filename)
+    assert sorted(baseline["tests"]) == ["add.fast", "add.tolerant"]
+
+    # A baseline ten times faster makes the tests significantly slower
+    for timing in baseline["tests"].values():
+        timing["mean"] /= 10
+        timing["stdev"] /= 10
+    comparisons = compare_baseline(baseline, tests)
+    assert [x["status"] for x in comparisons] == ["slower", "same"]
+    assert comparisons[0]["ratio"] > 5
+
+    del baseline["tests"]["add.fast"]
+    assert compare_baseline(baseline, tests)[0]["status"] == "new"
+
+
+def test_run_benchmarks(tmp_path, monkeypatch):
+    """Test that benchmarks time only the function, without other metrics"""
+    from gridtest.main.bench import run_benchmarks
+    from gridtest.main.test import GridRunner
+    from gridtest.utils import write_yaml
+    import gridtest.decorators
+
+    monkeypatch.setattr(gridtest.decorators, "GRIDTEST_BENCH_TIME", 0.001)
+    module = os.path.join(str(tmp_path), "square.py")
+    with open(module, "w") as fd:
+        fd.write("def square(x):\n    return x * x\n")
+    test_file = os.path.join(str(tmp_path), "square-tests.yml")
+    params = {"args": {"x": 2}, "returns": 4, "metrics": ["@timeit", "@peakmem"]}
+    write_yaml(
+        {"square": {"filename": module, "tests": {"square.square": [params]}}},
+        test_file,
+    )
+
+    tests = run_benchmarks(GridRunner(test_file))
+    (test,) = tests.values()
+    assert test.success
+    assert test.params["metrics"] == ["@benchmark"]
+    assert "@timeit" not in test.metrics and "@peakmem" not in test.metrics
+    assert len(test.metrics["@benchmark.mean"]) == 1
+
+
+def test_fit_scaling():
+    """Test fitting complexity models to measurements over a grid argument"""
+    from gridtest.main.stats import fit_scaling
+    from gridtest.main.scaling import get_scaling, exceeds
+    from gridtest.main.test import GridTestFunc
+
+    sizes = [10, 100, 1000, 10000] * 2
+    for model, function in [
+        ("constant", lambda n: 2.0),
+        ("n", lambda n: 1 + 0.5 * n),
+        ("n log n", lambda n: 0.1 * n * math.log(n)),
+        ("n^2", lambda n: 3 + n * n),
+    ]:
+        best = fit_scaling(sizes, [function(n) for n in sizes])[0]
+        assert best["model"] == model
+
+    best = fit_scaling(sizes, [2 * n ** 1.5 for n in sizes])[0]
+    assert best["model"] == "n^b" and round(best["b"], 6) == 1.5
+    assert exceeds(best, "n log n") and not exceeds(best, "n^2")
+
+    # Tests are grouped by function and the other arguments
+    def square(n, power):
+        return [0] * n ** power
+
+    tests = {}
+    for power in [1, 2]:
+        for n in [1, 2, 4, 8, 16, 32]:
+            params = {"args": {"n": n, "power": power}, "metrics": ["@timeit"]}
+            tests["square.%s.%s" % (n, power)] = GridTestFunc(square, params=params)
+            tests["square.%s.%s" % (n, power)].metrics = {"@timeit": [n ** power]}
+            tests["square.%s.%s" % (n, power)].success = True
+
+    results = get_scaling(tests, "n")
+    assert [x["group"] for x in results] == [{"power": "1"}, {"power": "2"}]
+    assert [x["fits"][0]["model"] for x in results] == ["n", "n^2"]
+    assert not exceeds(results[0]["fits"][0], "n")
+    assert exceeds(results[1]["fits"][0], "n log n")
@@ -26,6 +26,7 @@ echo "#### Testing basic tests"
 runTest 0 $output gridtest test $here/modules/basic-tests.yml
 runTest 0 $output gridtest test $here/modules/basic-tests.yml --serial
 runTest 0 $output gridtest check $here/modules/basic-tests.yml
+runTest 1 $output gridtest test $here/modules/basic-tests.yml --server --serial
 
 echo
 echo "#### Testing temp file and directory tests"
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+import os
+import pytest
+
+here = os.path.abspath(os.path.dirname(__file__))
+
+
+@pytest.mark.parametrize(
+    "filename", ["basic.py", "car.py", "metrics.py", "temp.py", "truefalse.py"]
+)
+def test_parse_functions(filename, monkeypatch):
+    """Test that parsing a file finds the same tests as importing it"""
+    from gridtest.main.generate import parse_functions, import_functions
+
+    monkeypatch.chdir(os.path.join(here, "modules"))
+    parsed = parse_functions(filename, quiet=True)
+    imported = import_functions(filename, quiet=True)
+    assert parsed == imported
+
+
+def test_parse_without_import(tmp_path, monkeypatch):
+    """Test that source is parsed without running it"""
+    from gridtest.main.generate import extract_functions
+
+    monkeypatch.chdir(str(tmp_path))
+    with open("sideeffect.py", "w") as fd:
+        fd.write(
+            "raise RuntimeError('imported')\n\n"
+            "def add(one, two=2, /, *args, three=3):\n    return one + two\n\n"
+            "class Base:\n    def __init__(self, name='base'):\n        pass\n\n"
+            "class Child(Base):\n    @property\n    def upper(self):\n        pass\n\n"
+            "class Failure(ValueError):\n    pass\n"
+        )
+    tests = extract_functions("sideeffect.py", quiet=True)["tests"]
+    assert tests["sideeffect.add"] == [{"args": {"one": None, "two": 2}}]
+    assert tests["sideeffect.Child"] == [{"args": {"name": "base"}}]
+    assert "Child.upper" not in tests
+    assert "sideeffect.Failure" not in tests
+
+
+def test_extract_files(tmp_path, monkeypatch):
+    """Test extracting files with workers, and reusing them from the cache"""
+    from gridtest.main import generate
+
+    monkeypatch.chdir(os.path.join(here, "modules"))
+    files = ["basic.py", "car.py", "temp.py", "truefalse.py"]
+    cache_dir = str(tmp_path / "cache")
+    extracted = generate.extract_files(files, quiet=True, nproc=2, cache_dir=cache_dir)
+    assert extracted == [generate.extract_functions(x, quiet=True) for x in files]
+    assert os.path.exists(os.path.join(cache_dir, "extracted.pkl"))
+
+    # Unchanged files aren't parsed again
+    def parse_worker(task):
+        raise AssertionError("%s was parsed again" % task[0])
+
+    monkeypatch.setattr(generate, "parse_worker", parse_worker)
+    cached = generate.extract_files(files, quiet=True, nproc=1, cache_dir=cache_dir)
+    assert cached == extracted
+
+
+def test_test_names():
+    """Test matching extracted functions to existing test names"""
+    from gridtest.main.check import TestNames
+
+    names = TestNames(["tests.modules.car.Car.honk", "basic.add"], ["skip_.*"])
+    assert "Car.honk" in names
+    assert "car.Car.honk" in names
+    assert "basic.add" in names
+    assert "tests.modules.basic.add" in names
+    assert "basic.skip_this" in names
+    assert "basic.my_add" not in names
+    assert "other.add" not in names
+    assert "car.Car" not in names
+
+    # Names are matched literally, not as patterns
+    assert "basicXadd" not in TestNames(["basic.add"])
+
+    # A suffix that more than one name ends with needs the full name
+    names = TestNames(["one.util.add", "two.util.add"])
+    assert "util.add" not in names and "add" not in names
+    assert "one.util.add" in names and "pkg.two.util.add" in names
+
+
+def test_update_tests(tmp_path):
+    """Test that update adds missing tests and keeps existing ones"""
+    from gridtest.main.update import update_tests
+    from gridtest.utils import read_yaml, write_yaml
+
+    testfile = str(tmp_path / "basic-tests.yml")
+    config = read_yaml(os.path.join(here, "modules", "basic-tests.yml"))
+    config["basic"]["filename"] = os.path.join(here, "modules", "basic.py")
+    del config["basic"]["tests"]["basic.hello"]
+    write_yaml(config, testfile)
+
+    update_tests(testfile)
+    tests = read_yaml(testfile)["basic"]["tests"]
+    assert tests["basic.hello"] == [{"args": {"name": None}}]
+    assert tests["basic.add"] == config["basic"]["tests"]["basic.add"]
+    assert len(tests) == 5
+
+
+def test_missing_tests_by_section(tmp_path):
+    """Test that a test in one section doesn't count for another file"""
+    from gridtest.main.check import get_missing_tests
+    from gridtest.utils import write_yaml
+
+    for name in ["first", "second"]:
+        with open(str(tmp_path / ("%s.py" % name)), "w") as fd:
+            fd.write("def add(one, two):\n    return one + two\n")
+    config = {
+        "first": {
+            "filename": str(tmp_path / "first.py"),
+            "tests": {"first.add": [{"args": {"one": 1, "two": 2}}]},
+        },
+        "second": {"filename": str(tmp_path / "second.py"), "tests": {}},
+    }
+    testfile = str(tmp_path / "tests.yml")
+    write_yaml(config, testfile)
+    missing = get_missing_tests(testfile)
+    assert len(missing) == 1 and missing[0].endswith("second.add")
@@ -10,6 +10,7 @@ with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 import os
+import re
 import pytest
 
 here = os.path.abspath(os.path.dirname(__file__))
@@ -23,6 +24,11 @@ def runner():
     return GridRunner(test_file)
 
 
+def get_test(tests, name, index=0):
+    """return the test for a function at an index, in the order generated"""
+    return [test for test in tests.values() if test.name == name][index]
+
+
 def test_gridrunner(runner):
     """Load a gridtest runner and test for a basic file.
     """
@@ -45,7 +51,7 @@ def test_gridrunner(runner):
 def test_returns(runner):
     """Run a test that checks for a return value"""
     tests = runner.get_tests()
-    returns_test = tests["basic.add.0"]
+    returns_test = get_test(tests, "basic.add")
 
     # Test is not successful before run, no result
     assert not returns_test.result
@@ -67,7 +73,7 @@ def test_returns(runner):
 def test_runs(runner):
     """Run a test that does not checks (other than working)"""
     tests = runner.get_tests()
-    returns_test = tests["basic.add.1"]
+    returns_test = get_test(tests, "basic.add", 1)
 
     # Test is not successful before run, no result
     assert not returns_test.result
@@ -76,6 +82,25 @@ def test_runs(runner):
     assert returns_test.success
 
 
+def test_stable_ids(runner):
+    """Test that tests are named by a stable id, and not their position"""
+    tests = runner.get_tests()
+    test = get_test(tests, "basic.add", 1)
+    name = "basic.add.%s" % test.short_id
+    assert tests[name] is test
+
+    # Adding a test before it doesn't change the name, but changing checks does
+    entries = runner.config["basic"]["tests"]["basic.add"]
+    entries.insert(0, {"args": {"one": 5, "two": 5}, "returns": 10})
+    assert tests[name].id == runner.get_tests()[name].id
+    entries[2]["raises"] = "ValueError"
+    assert name not in runner.get_tests()
+
+    # Repeated argsets are numbered
+    entries.append(dict(entries[0]))
+    assert len(runner.get_tests()) == len(tests) + 2
+
+
 def test_broken_func():
     """Run a test for a broken function"""
     from gridtest.main.test import GridTestFunc
@@ -176,7 +201,7 @@ def test_istrue_isfalse():
     tests = runner.get_tests()
 
     # This test should have istrue and isfalse statements
-    test = tests["truefalse.add.0"]
+    test = get_test(tests, "truefalse.add")
     for result in ["istrue", "isfalse"]:
         assert result in test.params
 
@@ -200,7 +225,7 @@ def test_classes():
     runner = GridRunner(test_file)
     tests = runner.get_tests()
 
-    test = tests["car.Car.1"]
+    test = get_test(tests, "car.Car", 1)
     assert not test.result
     assert "isinstance" in test.params
     test.run()
@@ -228,3 +253,610 @@ def test_metrics():
 
     with pytest.raises(SystemExit):
         tests = runner.get_tests()
+
+
+def test_recorded_metrics():
+    """Test that decorators record typed values, separate from the output
+    """
+    from gridtest.main.test import GridTestFunc
+
+    def make_list(count):
+        print("@length is printed by the function")
+        return list(range(count))
+
+    params = {"args": {"count": 10}, "metrics": ["@timeit", "@length", "@result"]}
+    test = GridTestFunc(make_list, params=params)
+    test.run()
+    assert test.success
+    assert isinstance(test.metrics["@timeit"][0], float)
+    assert test.metrics["@length"] == [10]
+    assert test.metrics["@result"] == [str(list(range(10)))]
+    assert test.out == ["@length is printed by the function"]
+
+
+def test_benchmark_metric(monkeypatch):
+    """Test that @benchmark records statistics for calibrated rounds of calls
+    """
+    from gridtest.main.test import GridTestFunc
+    from gridtest.main.stats import describe
+    import gridtest.decorators
+
+    monkeypatch.setattr(gridtest.decorators, "GRIDTEST_BENCH_TIME", 0.001)
+    monkeypatch.setattr(gridtest.decorators, "GRIDTEST_BENCH_ROUNDS", 3)
+
+    def add(one, two):
+        return one + two
+
+    params = {"args": {"one": 1, "two": 2}, "metrics": ["@benchmark"], "returns": 3}
+    test = GridTestFunc(add, params=params)
+    test.run()
+    assert test.success
+    assert "@benchmark" not in test.metrics
+    assert test.metrics["@benchmark.rounds"] == [3]
+    assert test.metrics["@benchmark.loops"][0] > 1
+    assert 0 < test.metrics["@benchmark.min"][0] <= test.metrics["@benchmark.p95"][0]
+
+    stats = describe([4, 1, 3, 2])
+    assert stats["median"] == 2.5
+    assert stats["mean"] == 2.5
+    assert round(stats["p95"], 2) == 3.85
+
+
+def test_memory_metrics():
+    """Test that @peakmem and @allocations record memory used by a call
+    """
+    from gridtest.main.test import GridTestFunc
+
+    def make_list(count):
+        return [str(x) for x in range(count)]
+
+    params = {"args": {"count": 100000}, "metrics": ["@peakmem"]}
+    test = GridTestFunc(make_list, params=params)
+    test.run()
+    assert isinstance(test.metrics["@peakmem"][0], int)
+
+    params = {"args": {"count": 100000}, "metrics": ["@allocations"]}
+    test = GridTestFunc(make_list, params=params)
+    test.run()
+    assert test.metrics["@allocations.peak"][0] > 100000
+    assert test.metrics["@allocations.blocks"][0] >= 100000
+    assert test.metrics["@allocations.sites"][0].startswith("test_gridtest.py:")
+
+
+def test_resources_metric():
+    """Test that @resources records cpu time, and the fraction of time on cpu
+    """
+    from gridtest.main.test import GridTestFunc
+    import time
+
+    def gotosleep(seconds):
+        time.sleep(seconds)
+
+    params = {"args": {"seconds": 0.1}, "metrics": ["@resources"]}
+    test = GridTestFunc(gotosleep, params=params)
+    test.run()
+    assert test.metrics["@resources.wall"][0] >= 0.1
+    assert test.metrics["@resources.cpu"][0] < 0.5
+    for key in ["user", "system", "voluntary_switches", "minor_faults"]:
+        assert test.metrics["@resources.%s" % key][0] >= 0
+
+
+def test_profile(tmp_path):
+    """Test that tests can be profiled, and profiles merged per function and slice
+    """
+    from gridtest.main.test import GridTest
+    from gridtest.main.profiles import set_profiles, save_profiles
+
+    tests = {}
+    for count in [10, 1000]:
+        tests["metrics.add.%s" % count] = GridTest(
+            module="metrics",
+            name="metrics.add",
+            filename=os.path.join(here, "modules", "metrics.py"),
+            params={"args": {"one": count, "two": 2}, "metrics": ["@profile"]},
+        )
+
+    # Without a profile directory, stats are recorded but not saved
+    for test in tests.values():
+        test.run()
+        assert test.metrics["@profile.calls"][0] > 0
+        assert "@profile.file" not in test.metrics
+
+    # With other metrics, @profile is added first, to profile only the function
+    for test in tests.values():
+        test.params["metrics"] = ["@timeit", "@resources"]
+
+    profile_dir = str(tmp_path)
+    set_profiles(profile_dir, tests)
+    for test in tests.values():
+        assert test.params["metrics"] == ["@profile", "@timeit", "@resources"]
+        test.run()
+        assert "@profile.file" not in test.metrics
+    save_profiles(profile_dir, tests)
+    for test in tests.values():
+        assert os.path.exists(test.metrics["@profile.file"][0])
+    assert os.path.exists(os.path.join(profile_dir, "metrics.add.pstats"))
+    assert os.path.exists(os.path.join(profile_dir, "metrics.add", "one=10.pstats"))
+    assert os.path.exists(os.path.join(profile_dir, "tests", "metrics.add.10.pstats"))
+    with open(os.path.join(profile_dir, "hotspots.txt"), "r") as fd:
+        hotspots = fd.read()
+    assert "metrics.py:" in hotspots and "getrusage" not in hotspots
+
+
+def test_result_policy():
+    """test that a result can be kept, digested, or discarded
+    """
+    from gridtest.main.test import GridTestFunc
+
+    def make_list(count: int) -> list:
+        return list(range(count))
+
+    # Keep is the default
+    test = GridTestFunc(make_list, params={"args": {"count": 10}, "returns": 10})
+    assert test.result_policy == "keep"
+
+    # Digest keeps a hash and size, and can still check returns
+    params = {"args": {"count": 10}, "result": "digest", "returns": list(range(10))}
+    test = GridTestFunc(make_list, params=params)
+    test.run()
+    assert test.success
+    assert test.result["digest"].startswith("sha256:")
+    assert test.result["size"] > 0
+
+    # A digest can only be compared to values, not checked as the result
+    for key, value in [("istrue", "{{ result }} == 10"), ("isinstance", "list")]:
+        with pytest.raises(SystemExit):
+            params = {"args": {"count": 10}, "result": "digest", key: value}
+            GridTestFunc(make_list, params=params)
+    params = {"args": {"count": 1}, "result": "digest", "equals": "{{ result }}"}
+    with pytest.raises(SystemExit):
+        GridTestFunc(make_list, params=params)
+
+    # Discard doesn't return the result, and cannot check returns
+    params = {"args": {"count": 10}, "result": "discard", "returns": list(range(10))}
+    test = GridTestFunc(make_list, params=params)
+    test.run()
+    assert test.result is None
+    assert not test.success
+
+    # An invalid policy exits
+    with pytest.raises(SystemExit):
+        GridTestFunc(make_list, params={"args": {"count": 1}, "result": "invalid"})
+
+
+def test_output_policy(monkeypatch):
+    """test that output is kept up to a limit, spilled to a file, or discarded
+    """
+    from gridtest.main.test import GridTestFunc
+    import gridtest.main.helpers
+
+    monkeypatch.setattr(gridtest.main.helpers, "GRIDTEST_OUTPUT_SIZE", 100)
+
+    def chatty(count):
+        for i in range(count):
+            print("line %s" % i)
+
+    # Short output is kept as it is
+    test = GridTestFunc(chatty, params={"args": {"count": 3}})
+    assert test.output_policy == "keep"
+    test.run()
+    assert test.out == ["line 0", "line 1", "line 2"]
+
+    # Long output keeps the start and end, and says how much is missing
+    test = GridTestFunc(chatty, params={"args": {"count": 1000}})
+    test.run()
+    assert test.out[0] == "line 0" and test.out[-1] == "line 999"
+    missing = [x for x in test.out if x.startswith("...")]
+    assert re.match("[.]{3} [0-9]+ characters not captured [.]{3}$", missing[0])
+
+    # Spill writes all of the output to a file for the worker
+    test = GridTestFunc(chatty, params={"args": {"count": 1000}, "output": "spill"})
+    test.run()
+    missing = [x for x in test.out if x.startswith("...")]
+    match = re.search("see (.+) from ([0-9]+)", missing[0])
+    with open(match.group(1), "r") as fd:
+        fd.seek(int(match.group(2)))
+        assert fd.read().splitlines()[:1000] == ["line %s" % i for i in range(1000)]
+
+    test = GridTestFunc(chatty, params={"args": {"count": 1000}, "output": "discard"})
+    test.run()
+    assert test.success and test.out == []
+
+    with pytest.raises(SystemExit):
+        GridTestFunc(chatty, params={"args": {"count": 1}, "output": "invalid"})
+
+
+def test_stream_results(runner, tmp_path):
+    """test that results can be streamed to ndjson as tests finish
+    """
+    import json
+
+    for extension in ["ndjson", "jsonl"]:
+        for parallel in [True, False]:
+            output_file = os.path.join(str(tmp_path), "results.%s" % extension)
+            assert runner.run(parallel=parallel, save=output_file) == 0
+            with open(output_file, "r") as fd:
+                records = [json.loads(line) for line in fd.readlines()]
+            assert len(records) == len(runner.get_tests())
+            assert "basic.add" in [record["function"] for record in records]
+            assert len(set(record["id"] for record in records)) == len(records)
+
+
+def test_save_metrics_columns(runner, tmp_path):
+    """test that metrics can be saved as a table, one column per arg and metric
+    """
+    import csv
+    from gridtest.main.test import GridTestFunc
+
+    def make_list(count, name="list"):
+        return list(range(count))
+
+    tests = {}
+    for count in [1, 2, 3]:
+        params = {"args": {"count": count}, "metrics": ["@length", "@timeit"]}
+        tests["make_list.%s" % count] = GridTestFunc(make_list, params=params)
+        tests["make_list.%s" % count].run()
+
+    output_file = os.path.join(str(tmp_path), "metrics.csv")
+    runner.save_metrics(output_file, tests)
+    with open(output_file, "r") as fd:
+        rows = list(csv.DictReader(fd))
+
+    assert len(rows) == 3
+    assert set(rows[0].keys()) == set(
+        ["name", "id", "function", "count", "@length", "@timeit", "success", "raises"]
+    )
+    assert [float(row["@length"]) for row in rows] == [1.0, 2.0, 3.0]
+    assert [int(row["count"]) for row in rows] == [1, 2, 3]
+
+
+def test_group_metrics(capsys):
+    """Test that metrics are summarized for each function and grouped args
+    """
+    from gridtest.main.test import GridTestFunc
+    from gridtest.main.results import group_metrics, print_groups
+
+    def add(one, two):
+        return one + two
+
+    tests = {}
+    for one in [1, 2]:
+        for two in range(10):
+            params = {"args": {"one": one, "two": two}, "metrics": ["@timeit"]}
+            test = GridTestFunc(add, params=params)
+            test.metrics = {"@timeit": [float(two)], "@result": ["%s ms" % one]}
+            tests["add.%s.%s" % (one, two)] = test
+
+    rows = group_metrics(tests, ["one"])
+    assert [(x["args"], x["metric"]) for x in rows] == [
+        ({"one": 1}, "@timeit"),
+        ({"one": 1}, "@result"),
+        ({"one": 2}, "@timeit"),
+        ({"one": 2}, "@result"),
+    ]
+    assert rows[0]["count"] == 10 and rows[0]["mean"] == 4.5
+    assert rows[0]["min"] == 0 and rows[0]["median"] == 4.5 and rows[0]["max"] == 9
+    assert rows[3]["mean"] == 2.0
+
+    rows = group_metrics(tests)
+    assert len(rows) == 2 and rows[0]["count"] == 20 and rows[0]["args"] == {}
+
+    print_groups(group_metrics(tests, ["one"]), ["one"])
+    out = capsys.readouterr().out
+    assert "@timeit" in out and "median" in out
+
+
+def test_save_sqlite(runner, tmp_path):
+    """test that runs are added to a sqlite database
+    """
+    import sqlite3
+
+    output_file = os.path.join(str(tmp_path), "results.sqlite")
+    assert runner.run(save=output_file) == 0
+    assert runner.run(parallel=False, save=output_file) == 0
+
+    conn = sqlite3.connect(output_file)
+    assert conn.execute("SELECT count(*) FROM runs").fetchone()[0] == 2
+    count = conn.execute("SELECT count(*) FROM tests WHERE run_id = 2").fetchone()[0]
+    assert count == len(runner.get_tests())
+    rows = conn.execute(
+        "SELECT args.name, args.number FROM args JOIN tests ON args.test_id = tests.id "
+        "WHERE tests.uid = ? AND tests.run_id = 1",
+        (get_test(runner.get_tests(), "basic.add").id,),
+    ).fetchall()
+    assert ("one", 1.0) in rows
+
+
+def test_save_report(runner, tmp_path):
+    """test that a report has a summary and pages of tests for each function
+    """
+    import json
+
+    report_dir = os.path.join(str(tmp_path), "web")
+    assert runner.run(save_report=report_dir) == 0
+    for filename in ["index.html", "gridtest.js", "summary.json"]:
+        assert os.path.exists(os.path.join(report_dir, filename))
+
+    with open(os.path.join(report_dir, "summary.json"), "r") as fd:
+        summary = json.loads(fd.read())
+    assert summary["total"] == len(runner.get_tests())
+    assert summary["success"] == summary["total"]
+
+    count = 0
+    for function in summary["functions"]:
+        for page in function["pages"]:
+            with open(os.path.join(report_dir, page), "r") as fd:
+                count += len(json.loads(fd.read()))
+    assert count == summary["total"]
+
+
+def test_incremental(tmp_path, monkeypatch):
+    """test that an incremental run reuses results for unchanged tests
+    """
+    import shutil
+    from gridtest.main import test as gridtest_test
+    from gridtest.main.test import GridRunner
+
+    for filename in ["basic.py", "basic-tests.yml"]:
+        shutil.copyfile(
+            os.path.join(here, "modules", filename),
+            os.path.join(str(tmp_path), filename),
+        )
+    test_file = os.path.join(str(tmp_path), "basic-tests.yml")
+    monkeypatch.setattr(gridtest_test, "GRIDTEST_CACHE_DIR", None)
+
+    # The first run populates the cache, the second has all hits
+    runner = GridRunner(test_file)
+    assert runner.run(incremental=True) == 0
+    assert os.path.exists(os.path.join(str(tmp_path), ".gridtest_cache"))
+
+    runner = GridRunner(test_file)
+    tests = runner.get_tests()
+    from gridtest.main.cache import ResultsCache
+
+    cache = ResultsCache(runner.get_cache_dir())
+    assert cache.load(tests) == {}
+    assert cache.hits == len(tests)
+    assert all(test.success for test in tests.values())
+
+    # Changing an argument invalidates only that test
+    runner.config["basic"]["tests"]["basic.add"][0]["args"]["one"] = 10
+    tests = runner.get_tests()
+    torun = cache.load(tests)
+    assert list(torun.values()) == [get_test(tests, "basic.add")]
+    assert cache.prune(float("inf")) > 0
+
+
+def test_incremental_cleanup(tmp_path, monkeypatch):
+    """test that temporary paths of tests reused from the cache are removed
+    """
+    import shutil
+    import tempfile
+    from gridtest.main import test as gridtest_test
+    from gridtest.main.test import GridRunner
+
+    for filename in ["temp.py", "temp-tests.yml"]:
+        shutil.copyfile(
+            os.path.join(here, "modules", filename),
+            os.path.join(str(tmp_path), filename),
+        )
+    temp_dir = os.path.join(str(tmp_path), "tmp")
+    os.mkdir(temp_dir)
+    monkeypatch.setattr(tempfile, "tempdir", temp_dir)
+    monkeypatch.setattr(gridtest_test, "GRIDTEST_CACHE_DIR", None)
+
+    test_file = os.path.join(str(tmp_path), "temp-tests.yml")
+    for run in range(2):
+        assert GridRunner(test_file).run(incremental=True, parallel=False) == 0
+        assert os.listdir(temp_dir) == []
+
+
+def test_last_failed(tmp_path, monkeypatch):
+    """test that failed tests are recorded, and can be run again (or first)
+    """
+    import shutil
+    from gridtest.main import test as gridtest_test
+    from gridtest.main.test import GridRunner
+
+    for filename in ["basic.py", "basic-tests.yml"]:
+        shutil.copyfile(
+            os.path.join(here, "modules", filename),
+            os.path.join(str(tmp_path), filename),
+        )
+    test_file = os.path.join(str(tmp_path), "basic-tests.yml")
+    monkeypatch.setattr(gridtest_test, "GRIDTEST_CACHE_DIR", None)
+
+    # With no failures, all tests are run and no state is written
+    runner = GridRunner(test_file)
+    tests = runner.get_tests()
+    assert runner.order_failed(tests, last_failed=True) == tests
+    assert runner.run() == 0
+    assert not os.path.exists(os.path.join(runner.get_cache_dir(), "lastfailed.json"))
+
+    # Make the last test fail
+    runner.config["basic"]["tests"]["basic.add"][0]["returns"] = 100
+    assert runner.run() == 1
+    tests = runner.get_tests()
+    failed = get_test(tests, "basic.add")
+    assert list(runner.order_failed(tests, last_failed=True).values()) == [failed]
+    ordered = list(runner.order_failed(tests).values())
+    assert ordered[0] == failed
+    assert len(ordered) == len(tests)
+
+    # When the test passes again, it's removed from the failures
+    runner.config["basic"]["tests"]["basic.add"][0]["returns"] = 3
+    assert runner.run(last_failed=True) == 0
+    tests = runner.get_tests()
+    assert runner.order_failed(tests, last_failed=True) == tests
+
+
+def test_watch(tmp_path):
+    """test that a watcher finds changes to the test file and sources
+    """
+    import shutil
+    from gridtest.main.test import GridRunner
+    from gridtest.main.watch import Watcher
+
+    for filename in ["basic.py", "basic-tests.yml"]:
+        shutil.copyfile(
+            os.path.join(here, "modules", filename),
+            os.path.join(str(tmp_path), filename),
+        )
+    test_file = os.path.join(str(tmp_path), "basic-tests.yml")
+    source_file = os.path.join(str(tmp_path), "basic.py")
+
+    runner = GridRunner(test_file)
+    watcher = Watcher(runner, interval=0.01)
+    assert watcher.sources[source_file] == set(["basic"])
+
+    # A changed source affects its section, and the test file is reloaded
+    stat = os.stat(source_file)
+    os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert watcher.wait() == (False, set(["basic"]))
+    stat = os.stat(test_file)
+    os.utime(test_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert watcher.wait() == (True, set())
+
+    # A copy of a test is the same test, but not run
+    test = get_test(runner.get_tests(), "basic.add")
+    test.run()
+    copy = test.copy()
+    assert copy.id == test.id
+    assert copy.result is None and test.result == 3
+
+
+def test_watch_cleanup(tmp_path, monkeypatch):
+    """test that tests loaded again (but not run) by a watcher are cleaned up
+    """
+    import shutil
+    import tempfile
+    from gridtest.main.test import GridRunner
+    from gridtest.main.watch import Watcher
+
+    for filename in ["temp.py", "temp-tests.yml"]:
+        shutil.copyfile(
+            os.path.join(here, "modules", filename),
+            os.path.join(str(tmp_path), filename),
+        )
+    temp_dir = os.path.join(str(tmp_path), "tmp")
+    os.mkdir(temp_dir)
+    monkeypatch.setattr(tempfile, "tempdir", temp_dir)
+
+    # The test file is loaded again once, and then the watcher is stopped
+    changes = [(True, set())]
+
+    def wait(self):
+        if not changes:
+            raise KeyboardInterrupt
+        return changes.pop()
+
+    monkeypatch.setattr(Watcher, "wait", wait)
+    runner = GridRunner(os.path.join(str(tmp_path), "temp-tests.yml"))
+    assert runner.watch(parallel=False) == 0
+    assert os.listdir(temp_dir) == []
+
+
+def test_serve(tmp_path):
+    """test that runs can be submitted to a server with a warm pool
+    """
+    import threading
+    from gridtest.main.server import GridServer, submit
+
+    socket_path = os.path.join(str(tmp_path), "gridtest.sock")
+    server = GridServer(socket_path=socket_path, nproc=2)
+    server.open()
+    thread = threading.Thread(target=server.serve, kwargs={"count": 4})
+    thread.start()
+    try:
+        request = {"input_file": os.path.join(here, "modules", "basic-tests.yml")}
+        output_file = os.path.join(str(tmp_path), "results.ndjson")
+        assert submit(dict(request, save=output_file), socket_path) == 0
+        pool = server.pool
+        assert submit(dict(request, regexp="hello"), socket_path) == 0
+        assert server.pool is pool
+        assert os.path.exists(output_file)
+
+        # A run that raises doesn't leave a broken pool for the next one
+        assert submit(dict(request, nproc=None), socket_path) == 1
+        assert server.pool is None
+        assert submit(request, socket_path) == 0
+    finally:
+        thread.join()
+        server.close()
+    assert not os.path.exists(socket_path)
+
+
+def test_serve_incremental(tmp_path, monkeypatch):
+    """test that a server doesn't reuse cached results after a source changes
+    """
+    import threading
+    from gridtest.main import test as gridtest_test
+    from gridtest.main.server import GridServer, submit
+    from gridtest.utils import write_yaml
+
+    monkeypatch.setattr(gridtest_test, "GRIDTEST_CACHE_DIR", None)
+    module = os.path.join(str(tmp_path), "square.py")
+    with open(module, "w") as fd:
+        fd.write("def f(x):\n    return x\n")
+    test_file = os.path.join(str(tmp_path), "square-tests.yml")
+    write_yaml(
+        {
+            "square": {
+                "filename": module,
+                "tests": {"square.f": [{"args": {"x": 1}, "returns": 1}]},
+            }
+        },
+        test_file,
+    )
+
+    socket_path = os.path.join(str(tmp_path), "gridtest.sock")
+    server = GridServer(socket_path=socket_path, nproc=1)
+    server.open()
+    thread = threading.Thread(target=server.serve, kwargs={"count": 2})
+    thread.start()
+    try:
+        request = {"input_file": test_file, "incremental": True}
+        assert submit(dict(request), socket_path) == 0
+        with open(module, "w") as fd:
+            fd.write("def f(x):\n    return x + 100\n")
+        stat = os.stat(module)
+        os.utime(module, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert submit(dict(request), socket_path) == 1
+    finally:
+        thread.join()
+        server.close()
+
+
+def test_read_config(tmp_path, monkeypatch):
+    """test that a parsed gridtest file is cached by modified time and content
+    """
+    import pickle
+    from gridtest.main import cache
+    from gridtest.utils import load_yaml, write_yaml
+
+    monkeypatch.setattr(cache, "GRIDTEST_CONFIG_CACHE_SIZE", 0)
+    test_file = os.path.join(str(tmp_path), "gridtest.yml")
+    cache_dir = os.path.join(str(tmp_path), ".gridtest_cache")
+    write_yaml({"basic": {"filename": "basic.py"}}, test_file)
+    assert cache.read_config(test_file, cache_dir) == {
+        "basic": {"filename": "basic.py"}
+    }
+
+    # The cached copy is used for the same file, or the same content
+    (cache_file,) = [os.path.join(cache_dir, x) for x in os.listdir(cache_dir)]
+    with open(cache_file, "rb") as fd:
+        cached = pickle.load(fd)
+    cached["config"] = {"cached": True}
+    with open(cache_file, "wb") as fd:
+        pickle.dump(cached, fd)
+    assert cache.read_config(test_file, cache_dir) == {"cached": True}
+    stat = os.stat(test_file)
+    os.utime(test_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.read_config(test_file, cache_dir) == {"cached": True}
+
+    # Changed content is parsed again
+    write_yaml({"changed": True}, test_file)
+    assert cache.read_config(test_file, cache_dir) == {"changed": True}
+
+    # Python tags the safe loader can't construct are still loaded
+    assert load_yaml("value: !!python/tuple [1, 2]") == {"value": (1, 2)}
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+import subprocess
+import sys
+import pytest
+
+
+def get_imports(module):
+    """import a module in a new interpreter with -X importtime, and return the
+       names of the modules imported (e.g., to check heavy ones are deferred)
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module],
+        stderr=subprocess.PIPE,
+        check=True,
+    ).stderr.decode("utf-8")
+    imports = set()
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            imports.add(line.rsplit("|", 1)[-1].strip())
+    return imports
+
+
+@pytest.mark.parametrize(
+    "module,deferred",
+    [
+        ("gridtest.client", ["gridtest.main", "gridtest.defaults", "yaml"]),
+        ("gridtest.client.test", ["gridtest.main.test", "yaml", "json_tricks"]),
+        (
+            "gridtest.main.test",
+            ["json_tricks", "yaml", "multiprocessing", "sqlite3", "logging"],
+        ),
+        ("gridtest.main.server", ["gridtest.main.test", "multiprocessing"]),
+    ],
+)
+def test_deferred_imports(module, deferred):
+    """Test that importing a module doesn't import modules only needed later"""
+    imports = get_imports(module)
+    assert module in imports
+    for name in deferred:
+        assert name not in imports, "%s imports %s" % (module, name)
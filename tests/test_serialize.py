@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+
+Copyright (C) 2020 Vanessa Sochat.
+
+This Source Code Form is subject to the terms of the
+Mozilla Public License, v. 2.0. If a copy of the MPL was not distributed
+with this file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+
+import json
+import os
+import pytest
+
+
+class FakeArray:
+    """A stand in for a NumPy array, which serializes with tolist"""
+
+    def tolist(self):
+        return [1, 2, 3]
+
+
+def test_serializers(tmp_path):
+    """Test that each available serializer writes plain and custom types
+    """
+    from gridtest.serialize import get_serializer
+    from gridtest.utils import write_json, read_json
+
+    record = {
+        "name": "script.add.0",
+        "result": FakeArray(),
+        "args": {"one", "two"},
+        "raises": None,
+        "success": True,
+    }
+
+    for name in ["auto", "json", "orjson"]:
+        try:
+            serializer = get_serializer(name)
+        except SystemExit:
+            continue
+
+        loaded = json.loads(serializer.dumps(record))
+        assert loaded["result"] == [1, 2, 3]
+        assert sorted(loaded["args"]) == ["one", "two"]
+        assert loaded["raises"] is None
+
+        output_file = os.path.join(str(tmp_path), "%s.json" % name)
+        write_json(record, output_file, serializer=name)
+        assert read_json(output_file)["result"] == [1, 2, 3]
+
+    # Unknown serializers exit
+    with pytest.raises(SystemExit):
+        get_serializer("doesnotexist")
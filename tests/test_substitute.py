@@ -103,26 +103,28 @@ def test_substitute_gridtest():
     )
 
     tests = runner.get_tests()
+    lookup = {test.name: test for test in tests.values()}
+    create_directory = lookup["temp.create_directory"]
+    write_file = lookup["temp.write_file"]
 
     # After we create the tests, we have variable substitution
-    assert (
-        "{% tmp_dir %}"
-        not in tests["temp.create_directory.0"].params["args"]["dirname"]
-    )
-    assert "{% tmp_path %}" not in tests["temp.write_file.0"].params["args"]["filename"]
+    assert "{% tmp_dir %}" not in create_directory.params["args"]["dirname"]
+    assert "{% tmp_path %}" not in write_file.params["args"]["filename"]
 
     # The directory should exist (tmp_dir creates for the test) but not filename
-    assert os.path.exists(tests["temp.create_directory.0"].params["args"]["dirname"])
-    assert not os.path.exists(tests["temp.write_file.0"].params["args"]["filename"])
+    assert os.path.exists(create_directory.params["args"]["dirname"])
+    assert not os.path.exists(write_file.params["args"]["filename"])
 
     # Run the tests
     for name, test in tests.items():
         test.run(cleanup=False)
 
     # Assert that the output files are not cleaned up
-    assert os.path.exists(tests["temp.create_directory.0"].params["args"]["dirname"])
-    assert os.path.exists(tests["temp.write_file.0"].params["args"]["filename"])
+    assert os.path.exists(create_directory.params["args"]["dirname"])
+    assert os.path.exists(write_file.params["args"]["filename"])
 
     # Run again with cleanup
     for name, test in tests.items():
         test.run(cleanup=True)
+    assert not os.path.exists(create_directory.params["args"]["dirname"])
+    assert not os.path.exists(write_file.params["args"]["filename"])